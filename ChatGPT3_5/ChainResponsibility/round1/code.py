@@ -1,60 +1,103 @@
 from abc import ABC, abstractmethod
+from enum import Enum
+
+# Same value as logging.INFO
+INFO = 20
+
+
+class Outcome(Enum):
+    HANDLED = "handled"
+    PASS = "pass"
+
+
+# Default output sink: handlers emit %-style records, formatted only if written
+class StdoutSink:
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def emit(self, level, message, *args):
+        if level >= self.level:
+            print(message % args if args else message)
+
+
+default_sink = StdoutSink()
 
 
 # Base Handler class for Chain of Responsibility
 class Handler(ABC):
-    def __init__(self):
+    def __init__(self, sink=None):
         self._next_handler = None
+        self._sink = default_sink if sink is None else sink
 
     def set_next(self, handler):
         self._next_handler = handler
         return handler
 
-    @abstractmethod
+    def successor(self):
+        return self._next_handler
+
+    def set_sink(self, sink):
+        handler = self
+        while handler is not None:
+            handler._sink = sink
+            handler = handler.successor()
+
     def handle(self, request):
+        handler = self
+        while handler is not None:
+            outcome = handler.process(request)
+            if outcome is Outcome.HANDLED:
+                break
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            handler = handler.successor()
+        return request
+
+    @abstractmethod
+    def process(self, request):
         pass
 
 
 # Concrete Handlers
 class ConcreteHandlerA(Handler):
-    def handle(self, request):
-        print(f"Handler A processing request: {request}")
-        if self._next_handler:
-            self._next_handler.handle(request)
+    def process(self, request):
+        self._sink.emit(INFO, "Handler A processing request: %s", request)
+        return Outcome.PASS
 
 
 class ConcreteHandlerB(Handler):
-    def handle(self, request):
-        print(f"Handler B processing request: {request}")
-        if self._next_handler:
-            self._next_handler.handle(request)
+    def process(self, request):
+        self._sink.emit(INFO, "Handler B processing request: %s", request)
+        return Outcome.PASS
 
 
 # Base Handler Decorator
 class HandlerDecorator(Handler):
-    def __init__(self, handler):
-        super().__init__()
+    def __init__(self, handler, sink=None):
+        super().__init__(sink)
         self._handler = handler
 
     def set_next(self, handler):
         self._handler.set_next(handler)
         return handler
 
-    def handle(self, request):
-        self._handler.handle(request)
+    def successor(self):
+        return self._handler
+
+    def process(self, request):
+        return Outcome.PASS
 
 
 # Concrete Decorators
 class LoggingDecorator(HandlerDecorator):
-    def handle(self, request):
-        print(f"Logging request: {request}")
-        super().handle(request)
+    def process(self, request):
+        self._sink.emit(INFO, "Logging request: %s", request)
+        return Outcome.PASS
 
 
 class UppercaseDecorator(HandlerDecorator):
-    def handle(self, request):
-        request = request.upper()
-        super().handle(request)
+    def process(self, request):
+        return request.upper()
 
 
 # Main function to demonstrate functionality
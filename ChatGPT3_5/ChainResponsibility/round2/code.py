@@ -1,42 +1,90 @@
 from abc import ABC, abstractmethod
+from enum import Enum
+
+# Same value as logging.INFO
+INFO = 20
+
+
+class Outcome(Enum):
+    """What a handler did with a request. Any other value returned by process() is a transformed request."""
+    HANDLED = "handled"
+    PASS = "pass"
+
+
+# Default output sink: handlers emit %-style records, formatted only if written
+class StdoutSink:
+    """Prints records at or above its level to stdout. Any object with the same emit() works as a sink."""
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def emit(self, level, message, *args):
+        """Print message % args if the level is enabled; drop it unformatted otherwise."""
+        if level >= self.level:
+            print(message % args if args else message)
+
+
+default_sink = StdoutSink()
+
 
 # Base Handler class for Chain of Responsibility
 class Handler(ABC):
-    def __init__(self):
+    def __init__(self, sink=None):
         self._next_handler = None
+        self._sink = default_sink if sink is None else sink
 
     def set_next(self, handler):
         """Set the next handler in the chain."""
         self._next_handler = handler
         return handler
 
-    @abstractmethod
+    def successor(self):
+        """Return the handler the request goes to after this one."""
+        return self._next_handler
+
+    def set_sink(self, sink):
+        """Send the output of this handler and every hop after it to the given sink."""
+        handler = self
+        while handler is not None:
+            handler._sink = sink
+            handler = handler.successor()
+
     def handle(self, request):
-        """Handle the request. To be implemented by concrete handlers."""
+        """Walk the chain from this handler in a loop and return the request as it left the chain."""
+        handler = self
+        while handler is not None:
+            outcome = handler.process(request)
+            if outcome is Outcome.HANDLED:
+                break
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            handler = handler.successor()
+        return request
+
+    @abstractmethod
+    def process(self, request):
+        """Process the request at this hop: return Outcome.HANDLED, Outcome.PASS or a transformed request."""
         pass
 
 
 # Concrete Handlers
 class ConcreteHandlerA(Handler):
-    def handle(self, request):
-        """Process the request in Handler A and pass to next if available."""
-        print(f"Handler A processing request: {request}")
-        if self._next_handler:
-            self._next_handler.handle(request)
+    def process(self, request):
+        """Process the request in Handler A and pass it on."""
+        self._sink.emit(INFO, "Handler A processing request: %s", request)
+        return Outcome.PASS
 
 
 class ConcreteHandlerB(Handler):
-    def handle(self, request):
-        """Process the request in Handler B and pass to next if available."""
-        print(f"Handler B processing request: {request}")
-        if self._next_handler:
-            self._next_handler.handle(request)
+    def process(self, request):
+        """Process the request in Handler B and pass it on."""
+        self._sink.emit(INFO, "Handler B processing request: %s", request)
+        return Outcome.PASS
 
 
 # Base Handler Decorator
 class HandlerDecorator(Handler):
-    def __init__(self, handler):
-        super().__init__()
+    def __init__(self, handler, sink=None):
+        super().__init__(sink)
         self._handler = handler
 
     def set_next(self, handler):
@@ -44,24 +92,27 @@ class HandlerDecorator(Handler):
         self._handler.set_next(handler)
         return handler
 
-    def handle(self, request):
-        """Delegate the handling to the decorated handler."""
-        self._handler.handle(request)
+    def successor(self):
+        """The decorated handler runs right after the decorator."""
+        return self._handler
+
+    def process(self, request):
+        """Pass the request on to the decorated handler unchanged."""
+        return Outcome.PASS
 
 
 # Concrete Decorators
 class LoggingDecorator(HandlerDecorator):
-    def handle(self, request):
+    def process(self, request):
         """Log the request before passing it to the next handler."""
-        print(f"Logging request: {request}")
-        super().handle(request)
+        self._sink.emit(INFO, "Logging request: %s", request)
+        return Outcome.PASS
 
 
 class UppercaseDecorator(HandlerDecorator):
-    def handle(self, request):
+    def process(self, request):
         """Convert the request to uppercase and then pass it to the next handler."""
-        request = request.upper()
-        super().handle(request)
+        return request.upper()
 
 
 # Main function to demonstrate functionality
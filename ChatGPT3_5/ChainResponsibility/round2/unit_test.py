@@ -3,7 +3,7 @@ from io import StringIO
 import sys
 
 # นำเข้า classes จากไฟล์หลัก
-from code import Handler, ConcreteHandlerA, ConcreteHandlerB, LoggingDecorator, UppercaseDecorator
+from code import INFO, Handler, ConcreteHandlerA, ConcreteHandlerB, LoggingDecorator, StdoutSink, UppercaseDecorator
 
 
 @pytest.fixture
@@ -84,3 +84,47 @@ def test_chain_with_decorators(setup_handlers):
     assert "Handler A processing request: TEST" in output
     assert "Handler B processing request: TEST" in output
 
+
+
+def test_deep_chain_does_not_recurse(capsys):
+    # ทดสอบ chain ที่ยาวกว่า recursion limit
+    handlers = [ConcreteHandlerA() for _ in range(5000)]
+    for handler, successor in zip(handlers, handlers[1:]):
+        handler.set_next(successor)
+
+    assert LoggingDecorator(UppercaseDecorator(handlers[0])).handle("test") == "TEST"
+    assert capsys.readouterr().out.count("Handler A processing request: TEST") == 5000
+
+
+def test_handlers_emit_through_sink(capsys):
+    # ทดสอบ sink: level ที่ปิดอยู่ไม่ format request เลย
+    class Payload:
+        formatted = 0
+
+        def __str__(self):
+            Payload.formatted += 1
+            return "payload"
+
+    class RecordingSink:
+        def __init__(self):
+            self.records = []
+
+        def emit(self, level, message, *args):
+            self.records.append((level, message, args))
+
+    handler_a = ConcreteHandlerA()
+    handler_a.set_next(ConcreteHandlerB())
+    head = LoggingDecorator(handler_a)
+    head.set_sink(StdoutSink(level=INFO + 10))
+    payload = Payload()
+    head.handle(payload)
+    assert capsys.readouterr().out == "" and Payload.formatted == 0
+
+    sink = RecordingSink()
+    head.set_sink(sink)
+    head.handle(payload)
+    assert [message % args for _, message, args in sink.records] == [
+        "Logging request: payload",
+        "Handler A processing request: payload",
+        "Handler B processing request: payload",
+    ]
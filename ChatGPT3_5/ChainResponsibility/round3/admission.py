@@ -0,0 +1,126 @@
+import threading
+import time
+from collections.abc import Sized
+
+from code import Handler, Outcome
+
+
+class Overloaded(Exception):
+    """The admission handler rejected the request. reason is "rate" or "concurrency"."""
+
+    def __init__(self, reason):
+        super().__init__(f"request rejected: {reason} limit reached")
+        self.reason = reason
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: refills at rate tokens per second, holds at most burst."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if the bucket has them and return True; otherwise take none and return False."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+
+class AdmissionHandler(Handler):
+    """Head of a chain that limits how much work gets in, and sheds optional hops under load.
+
+    A request is rejected immediately with Overloaded when the token bucket is empty or
+    max_concurrency requests are already in the chain, so callers never queue behind a
+    spike. Admitted requests run the rest of the chain, skipping every hop whose
+    shed_level is at or below the current degradation level (LoggingDecorator sheds at
+    level 1). The level is the one set with degrade(), raised to 1 when more than
+    degrade_above requests are already in flight as the request is admitted.
+    """
+
+    __slots__ = ("_bucket", "_max_concurrency", "_degrade_above", "_level", "_in_flight", "_lock",
+                 "admitted", "rejected")
+
+    def __init__(self, bucket=None, max_concurrency=None, degrade_above=None, sink=None):
+        super().__init__(sink)
+        self._bucket = bucket
+        self._max_concurrency = max_concurrency
+        self._degrade_above = degrade_above
+        self._level = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def degrade(self, level):
+        """Set the degradation level; 0 runs every hop."""
+        if level < 0:
+            raise ValueError("level must not be negative")
+        self._level = level
+
+    @property
+    def in_flight(self):
+        """Number of admitted requests still in the chain."""
+        return self._in_flight
+
+    @property
+    def level(self):
+        """The degradation level a request admitted now would run at."""
+        level = self._level
+        if self._degrade_above is not None and self._in_flight > self._degrade_above:
+            level = max(level, 1)
+        return level
+
+    def _admit(self, count):
+        with self._lock:
+            if self._max_concurrency is not None and self._in_flight >= self._max_concurrency:
+                self.rejected += count
+                raise Overloaded("concurrency")
+            if self._bucket is not None and not self._bucket.try_acquire(count):
+                self.rejected += count
+                raise Overloaded("rate")
+            level = self.level
+            self._in_flight += 1
+            self.admitted += count
+            return level
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def process(self, request):
+        """Admission happens in handle(); as a hop this handler passes the request on."""
+        return Outcome.PASS
+
+    def walk(self, request):
+        """Admit the request or raise Overloaded, then walk the chain at the current degradation level.
+
+        handle() goes through here too. Metrics, tracing and output capture work as on
+        any other head.
+        """
+        level = self._admit(1)
+        try:
+            return self._walk(request, level)
+        finally:
+            self._release()
+
+    def handle_many(self, requests):
+        """Admit the batch as a whole (one token per request, one concurrency slot) or raise Overloaded."""
+        if not isinstance(requests, Sized):
+            requests = list(requests)
+        level = self._admit(len(requests))
+        try:
+            return self._handle_many(requests, level)
+        finally:
+            self._release()
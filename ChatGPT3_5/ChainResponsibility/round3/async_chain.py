@@ -0,0 +1,164 @@
+import asyncio
+from abc import ABC, abstractmethod
+from time import perf_counter_ns
+
+from code import Handler, Outcome, default_sink, loggable, uppercase
+from sinks import INFO
+from tracing import current_trace
+
+
+# Base Handler class for an asyncio Chain of Responsibility
+class AsyncHandler(ABC):
+    def __init__(self, sink=None):
+        self._next_handler = None
+        self._sink = default_sink if sink is None else sink
+        self._tracer = None
+
+    def set_next(self, handler):
+        """Set the next handler in the chain. It may be an AsyncHandler or a sync Handler."""
+        self._next_handler = handler
+        return handler
+
+    def successor(self):
+        """Return the handler the request goes to after this one."""
+        return self._next_handler
+
+    def enable_tracing(self, tracer):
+        """Trace a sample of the requests started at this handler with the given Tracer."""
+        self._tracer = tracer
+        return tracer
+
+    def disable_tracing(self):
+        """Stop starting traces at this handler."""
+        self._tracer = None
+
+    @abstractmethod
+    async def process(self, request):
+        """Process the request at this hop. Returns the same outcomes as Handler.process()."""
+        pass
+
+    async def handle(self, request):
+        """Walk the chain from this handler and return the request as it left the chain.
+
+        Sync Handler hops are processed inline, without leaving the event loop.
+        """
+        trace = current_trace.get()
+        if trace is None and self._tracer is not None:
+            trace = self._tracer.start(request)
+            if trace is not None:
+                # Each asyncio task runs in its own context copy, so this stays local to the task.
+                token = current_trace.set(trace)
+                try:
+                    result = await self._walk(request, trace)
+                finally:
+                    current_trace.reset(token)
+                self._tracer.finish(trace, result)
+                return result
+        return await self._walk(request, trace)
+
+    async def _walk(self, request, trace):
+        handler = self
+        while handler is not None:
+            if trace is not None:
+                start = perf_counter_ns()
+            if isinstance(handler, AsyncHandler):
+                outcome = await handler.process(request)
+            else:
+                outcome = handler.process(request)
+            handled = outcome is Outcome.HANDLED
+            request_in = request
+            if not handled and outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            if trace is not None:
+                trace.record(handler, perf_counter_ns() - start, request_in, request, handled)
+            if handled:
+                break
+            handler = handler.successor()
+        return request
+
+
+class ThreadedHandler(AsyncHandler):
+    """Run a whole sync chain in a worker thread so blocking handlers don't stall the loop."""
+
+    def __init__(self, handler: Handler):
+        super().__init__()
+        self._handler = handler
+
+    async def process(self, request):
+        """Hand the request to the sync chain and pass on the request it returns.
+
+        If a hop of the sync chain handled the request, this hop reports it handled
+        too, so the async chain stops here.
+        """
+        outcome, request = await asyncio.to_thread(self._handler.walk, request)
+        if outcome is Outcome.HANDLED:
+            return outcome
+        return request
+
+
+# Base Async Handler Decorator
+class AsyncHandlerDecorator(AsyncHandler):
+    def __init__(self, handler, sink=None):
+        super().__init__(sink)
+        self._handler = handler
+
+    def set_next(self, handler):
+        """Set the next handler in the chain for the decorator."""
+        self._handler.set_next(handler)
+        return handler
+
+    def successor(self):
+        """The decorated handler runs right after the decorator."""
+        return self._handler
+
+    async def process(self, request):
+        """Pass the request on to the decorated handler unchanged."""
+        return Outcome.PASS
+
+
+# Concrete Async Decorators
+class AsyncLoggingDecorator(AsyncHandlerDecorator):
+    async def process(self, request):
+        """Log the request before passing it to the next handler."""
+        self._sink.emit(INFO, "Logging request: %s", loggable(request))
+        return Outcome.PASS
+
+
+class AsyncUppercaseDecorator(AsyncHandlerDecorator):
+    async def process(self, request):
+        """Convert the request to uppercase and then pass it to the next handler."""
+        return uppercase(request)
+
+
+async def handle_concurrently(handler, requests, limit=100):
+    """Run requests through one chain concurrently, with at most `limit` in flight.
+
+    Returns the results of handler.handle() in input order. If a request raises, the
+    other workers are cancelled and the exception propagates.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    requests = list(requests)
+    results = [None] * len(requests)
+    if not requests:
+        return results
+    pending = iter(enumerate(requests))
+
+    async def worker():
+        # Workers share one iterator, so each request is taken exactly once.
+        for index, request in pending:
+            results[index] = await handler.handle(request)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(limit, len(requests)))]
+    try:
+        done, _ = await asyncio.wait(workers, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # After a failure, or if this call is cancelled, stop the workers still
+        # running instead of leaving them to finish requests nobody will collect.
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    for task in done:
+        if task.exception() is not None:
+            raise task.exception()
+    return results
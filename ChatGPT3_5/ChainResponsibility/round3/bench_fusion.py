@@ -0,0 +1,43 @@
+"""Per-request overhead of a decorator stack, with and without fuse().
+
+Run from this directory: python bench_fusion.py
+"""
+import logging
+import timeit
+
+from code import ConcreteHandlerA, HandlerDecorator, UppercaseDecorator, logger
+
+DEPTHS = [1, 2, 4, 8, 16, 32]
+
+
+def build_stack(depth):
+    """Wrap a single handler in `depth` decorators, alternating pass-through and uppercase."""
+    handler = ConcreteHandlerA()
+    for level in range(depth):
+        decorator = UppercaseDecorator if level % 2 else HandlerDecorator
+        handler = decorator(handler)
+    return handler
+
+
+def per_request_ns(call, number=20000, repeat=5):
+    best = min(timeit.repeat(lambda: call("request"), number=number, repeat=repeat))
+    return best / number * 1e9
+
+
+def main():
+    # Keep log output out of the measurement.
+    previous_level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        print(f"{'depth':>5} {'handle() ns':>12} {'fuse() ns':>10} {'speedup':>8}")
+        for depth in DEPTHS:
+            stack = build_stack(depth)
+            handled = per_request_ns(stack.handle)
+            fused = per_request_ns(stack.fuse())
+            print(f"{depth:>5} {handled:>12.0f} {fused:>10.0f} {handled / fused:>7.2f}x")
+    finally:
+        logger.setLevel(previous_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Memory per handler and per chain, slotted classes vs the old __dict__ layout.
+
+The "before" classes are plain subclasses without __slots__, which brings back the
+per-instance __dict__ (and __weakref__) the handlers used to have.
+Run from this directory: python bench_memory.py
+"""
+import gc
+import tracemalloc
+
+from code import ConcreteHandlerA, ConcreteHandlerB, LoggingDecorator, UppercaseDecorator
+
+CHAINS = 20000
+
+
+class DictConcreteHandlerA(ConcreteHandlerA):
+    pass
+
+
+class DictConcreteHandlerB(ConcreteHandlerB):
+    pass
+
+
+class DictLoggingDecorator(LoggingDecorator):
+    pass
+
+
+class DictUppercaseDecorator(UppercaseDecorator):
+    pass
+
+
+LAYOUTS = {
+    "before (__dict__)": (DictConcreteHandlerA, DictConcreteHandlerB, DictLoggingDecorator, DictUppercaseDecorator),
+    "after (__slots__)": (ConcreteHandlerA, ConcreteHandlerB, LoggingDecorator, UppercaseDecorator),
+}
+
+
+def build_chain(handler_a_class, handler_b_class, logging_class, uppercase_class):
+    """The chain from main(): LoggingDecorator(UppercaseDecorator(A -> B)), four objects."""
+    handler_a = handler_a_class()
+    handler_a.set_next(handler_b_class())
+    return logging_class(uppercase_class(handler_a))
+
+
+def measure(classes):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    chains = [build_chain(*classes) for _ in range(CHAINS)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # The list holding the chains is not part of their cost.
+    used -= chains.__sizeof__()
+    del chains
+    return used / CHAINS
+
+
+def main():
+    print(f"{'layout':<18} {'bytes/handler':>14} {'bytes/chain':>12}")
+    for name, classes in LAYOUTS.items():
+        per_chain = measure(classes)
+        print(f"{name:<18} {per_chain / 4:>14.0f} {per_chain:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
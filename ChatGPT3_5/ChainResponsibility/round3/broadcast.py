@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from async_chain import AsyncHandler
+from code import Outcome
+from pipeline import chain_stages
+
+
+def last_transform(request, outcomes):
+    """Default merge: pass on the transformed request of the latest hop in chain order, if any."""
+    for outcome in reversed(outcomes):
+        if outcome is not Outcome.PASS and outcome is not None and outcome is not Outcome.HANDLED:
+            return outcome
+    return request
+
+
+class Broadcast:
+    """Run a pass-to-all chain with its independent hops in parallel.
+
+    The chain's hops are looked up once. Runs of adjacent hops that declare
+    independent = True form a group: every hop in a group gets the same request and
+    the group runs concurrently, on a thread pool with handle() or as asyncio tasks
+    with handle_async(). Every other hop is a barrier that runs on its own, in chain
+    order, after the group before it finished, so hops that depend on earlier ones
+    still see their effects.
+
+    A group's outcomes are combined by merge(request, outcomes), where outcomes are
+    in chain order; by default a transform from the latest hop wins. If any hop in
+    a group handles the request, the chain stops after that group.
+    """
+
+    def __init__(self, head, max_workers=None, merge=last_transform):
+        groups = []
+        for hop in chain_stages(head):
+            independent = getattr(hop, "independent", False)
+            if independent and groups and groups[-1][0]:
+                groups[-1][1].append(hop)
+            else:
+                groups.append((independent, [hop]))
+        self._groups = tuple(tuple(hops) for _, hops in groups)
+        self._merge = merge
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def groups(self):
+        """The hops in execution order; hops in the same tuple run concurrently."""
+        return self._groups
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix="broadcast")
+            return self._executor
+
+    def _finish_group(self, request, outcomes):
+        handled = any(outcome is Outcome.HANDLED for outcome in outcomes)
+        return handled, self._merge(request, outcomes)
+
+    def handle(self, request):
+        """Broadcast the request, running each independent group on the thread pool."""
+        for group in self._groups:
+            if len(group) == 1:
+                outcomes = [group[0].process(request)]
+            else:
+                executor = self._pool()
+                # Each hop runs in a copy of the caller's context, so output capture
+                # and the active trace follow it into the pool thread.
+                futures = [
+                    executor.submit(contextvars.copy_context().run, hop.process, request) for hop in group
+                ]
+                outcomes = [future.result() for future in futures]
+            handled, request = self._finish_group(request, outcomes)
+            if handled:
+                break
+        return request
+
+    async def handle_async(self, request):
+        """Broadcast the request, running each independent group as asyncio tasks.
+
+        AsyncHandler hops are awaited; sync hops in a group run in worker threads so
+        they overlap with the rest of the group.
+        """
+        for group in self._groups:
+            if len(group) == 1:
+                hop = group[0]
+                outcome = hop.process(request)
+                if isinstance(hop, AsyncHandler):
+                    outcome = await outcome
+                outcomes = [outcome]
+            else:
+                outcomes = await asyncio.gather(*(
+                    hop.process(request) if isinstance(hop, AsyncHandler) else asyncio.to_thread(hop.process, request)
+                    for hop in group
+                ))
+            handled, request = self._finish_group(request, list(outcomes))
+            if handled:
+                break
+        return request
+
+    def close(self):
+        """Shut down the thread pool, if one was started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+# calls: requests received; executions: chain walks actually run; timeouts: callers
+# that gave up waiting; ratio: share of calls served by another caller's execution.
+CoalesceInfo = namedtuple("CoalesceInfo", ["calls", "executions", "timeouts", "ratio"])
+
+
+def _identity(request):
+    return request
+
+
+class _Counters:
+    """Call, execution and timeout counts shared by the threaded and asyncio fronts."""
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.timeouts = 0
+
+    def info(self):
+        """Return a CoalesceInfo for everything seen so far."""
+        calls = self.calls
+        ratio = (calls - self.executions) / calls if calls else 0.0
+        return CoalesceInfo(calls, self.executions, self.timeouts, ratio)
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "started")
+
+    def __init__(self, started):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.started = started
+
+
+class SingleFlight(_Counters):
+    """Coalesce identical concurrent requests in front of a sync chain.
+
+    handle is the chain's entry point, e.g. Handler.handle. The first caller for a
+    key runs it; callers with the same key that arrive while it runs wait and get
+    the same result, or the same exception. key(request) picks what counts as
+    identical and must be hashable; by default the request itself.
+
+    timeout bounds how long a waiter waits (TimeoutError), and how long a running
+    execution may be joined: callers arriving later start a fresh one. The caller
+    that runs the chain is never interrupted.
+    """
+
+    def __init__(self, handle, key=_identity, timeout=None, clock=time.monotonic):
+        super().__init__()
+        self._handle = handle
+        self._key = key
+        self._timeout = timeout
+        self._clock = clock
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def handle(self, request):
+        """Return the chain's result for the request, sharing any identical execution in flight."""
+        key = self._key(request)
+        now = self._clock()
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None or (self._timeout is not None and now - flight.started >= self._timeout)
+            if leader:
+                flight = self._flights[key] = _Flight(now)
+                self.executions += 1
+        if leader:
+            try:
+                flight.result = self._handle(request)
+            except BaseException as error:
+                flight.error = error
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight.done.set()
+        elif not flight.done.wait(self._timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"no result for {key!r} within {self._timeout}s")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+class AsyncSingleFlight(_Counters):
+    """Coalesce identical concurrent requests in front of an async chain.
+
+    handle is a coroutine function, e.g. AsyncHandler.handle. The first caller for a
+    key starts it as a task and every caller with the same key awaits that task.
+    A waiter that times out (asyncio.TimeoutError) or is cancelled leaves the shared
+    execution running for the others. key and timeout work as in SingleFlight.
+    """
+
+    def __init__(self, handle, key=_identity, timeout=None):
+        super().__init__()
+        self._handle = handle
+        self._key = key
+        self._timeout = timeout
+        self._flights = {}
+
+    async def handle(self, request):
+        """Return the chain's result for the request, sharing any identical execution in flight."""
+        key = self._key(request)
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.calls += 1
+        entry = self._flights.get(key)
+        if entry is None or (self._timeout is not None and now - entry[1] >= self._timeout):
+            task = loop.create_task(self._handle(request))
+            entry = self._flights[key] = (task, now)
+            self.executions += 1
+
+            def forget(task, key=key, entry=entry):
+                if self._flights.get(key) is entry:
+                    del self._flights[key]
+                if not task.cancelled():
+                    task.exception()  # retrieved here in case every waiter timed out
+
+            task.add_done_callback(forget)
+        task = entry[0]
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self._timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
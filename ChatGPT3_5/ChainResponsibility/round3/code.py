@@ -1,54 +1,415 @@
 import logging
 from abc import ABC, abstractmethod
+from enum import Enum
+from itertools import islice
+from time import perf_counter_ns
+
+from sinks import INFO, LoggerSink, NullSink, capture_output
+from tracing import current_trace
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it batches are always lists.
+    np = None
 
 # Set up logging configuration
 logging.basicConfig(level=logging.DEBUG, format='%(message)s')
 logger = logging.getLogger()
 
+# Sink used by handlers that are not given one; keeps the original logging output.
+default_sink = LoggerSink(logger)
+
+class Outcome(Enum):
+    """What a handler did with a request. Any other value returned by process() is a transformed request."""
+    HANDLED = "handled"
+    PASS = "pass"
+
+
+# Byte buffers are uppercased this many bytes at a time, so the temporary copies
+# stay the same size however large the payload is.
+UPPERCASE_CHUNK = 64 * 1024
+
+
+class BufferSummary:
+    """Stands in for a byte buffer in log records: formats as its type and size, never its contents."""
+    __slots__ = ("_buffer",)
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def __str__(self):
+        buffer = self._buffer
+        size = buffer.nbytes if isinstance(buffer, memoryview) else len(buffer)
+        return f"<{type(buffer).__name__} of {size} bytes>"
+
+
+def loggable(request):
+    """Return the request for a log record, wrapping byte buffers so they aren't dumped."""
+    if isinstance(request, (bytes, bytearray, memoryview)):
+        return BufferSummary(request)
+    return request
+
+
+def uppercase(request):
+    """Uppercase a request, in place when it is a mutable byte buffer.
+
+    A bytearray or writable memoryview is changed in place, UPPERCASE_CHUNK bytes at a
+    time, and Outcome.PASS is returned so the same buffer travels on. Anything else
+    (str, bytes, read-only memoryview) is immutable and gets an uppercased copy.
+    """
+    if isinstance(request, bytearray) or (isinstance(request, memoryview) and not request.readonly):
+        view = memoryview(request).cast("B")
+        for start in range(0, len(view), UPPERCASE_CHUNK):
+            stop = start + UPPERCASE_CHUNK
+            view[start:stop] = bytes(view[start:stop]).upper()
+        return Outcome.PASS
+    if isinstance(request, memoryview):
+        return request.tobytes().upper()
+    return request.upper()
+
+
+def _sheds(handler, level):
+    """True if the hop is optional at this degradation level and may be skipped."""
+    shed_level = handler.shed_level
+    return shed_level is not None and shed_level <= level
+
+
 # Base Handler class for Chain of Responsibility
 class Handler(ABC):
-    def __init__(self):
+    # Fixed attribute layout: handlers carry no per-instance __dict__. Subclasses
+    # that don't declare __slots__ get a __dict__ back and work as before.
+    __slots__ = ("_next_handler", "_sink", "_metrics", "_tracer")
+
+    # Degradation level at which an admission handler may skip this hop under load;
+    # None means the hop always runs.
+    shed_level = None
+
+    # True for hops that only observe the request: they don't transform it and don't
+    # depend on the hops around them, so broadcast mode may run them concurrently.
+    independent = False
+
+    def __init__(self, sink=None):
         self._next_handler = None
+        self._sink = default_sink if sink is None else sink
+        self._metrics = None
+        self._tracer = None
 
     def set_next(self, handler):
         """Set the next handler in the chain."""
         self._next_handler = handler
         return handler
 
+    def set_sink(self, sink):
+        """Send the output of this handler and every hop after it to the given sink."""
+        handler = self
+        seen = set()
+        while handler is not None and id(handler) not in seen:
+            seen.add(id(handler))
+            handler._sink = sink
+            handler = handler.successor()
+        return self
+
+    def successor(self):
+        """Return the handler the request goes to after this one."""
+        return self._next_handler
+
+    def enable_metrics(self, metrics=None):
+        """Measure every hop of requests started at this handler. Return the ChainMetrics in use."""
+        if metrics is None:
+            # Imported here so this module, and its demo, load without common/ on sys.path.
+            from chain_metrics import ChainMetrics
+            metrics = ChainMetrics()
+        self._metrics = metrics
+        return metrics
+
+    def disable_metrics(self):
+        """Stop measuring hops."""
+        self._metrics = None
+
+    @property
+    def metrics(self):
+        """The ChainMetrics in use, or None if metrics are off."""
+        return self._metrics
+
+    def enable_tracing(self, tracer):
+        """Trace a sample of the requests started at this handler with the given Tracer."""
+        self._tracer = tracer
+        return tracer
+
+    def disable_tracing(self):
+        """Stop starting traces at this handler."""
+        self._tracer = None
+
     @abstractmethod
-    def handle(self, request):
-        """Handle the request. To be implemented by concrete handlers."""
+    def process(self, request):
+        """Process the request at this hop. To be implemented by concrete handlers.
+
+        Return Outcome.HANDLED to stop the chain, Outcome.PASS (or None) to pass the
+        request on unchanged, or a transformed request to pass on instead.
+        """
         pass
 
+    def process_many(self, requests):
+        """Process a batch of requests at this hop and return one outcome per request."""
+        process = self.process
+        return [process(request) for request in requests]
+
+    def process_array(self, requests):
+        """Process a NumPy array of requests at this hop in one vectorized step.
+
+        Return Outcome.PASS to pass the whole array on, or a transformed array of the
+        same length. The default returns NotImplemented, and the chain processes the
+        rest of the batch element by element from this hop.
+        """
+        return NotImplemented
+
+    def handle(self, request):
+        """Walk the chain from this handler in a loop and return the request as it left the chain."""
+        return self.walk(request)[1]
+
+    def walk(self, request):
+        """Walk the chain like handle(), but return (outcome, request).
+
+        outcome is Outcome.HANDLED if a hop handled the request and Outcome.PASS if it
+        ran off the end of the chain; request is what handle() would return.
+        """
+        return self._walk(request, None)
+
+    def _walk(self, request, level):
+        """walk(), skipping every hop that sheds at degradation level `level` (None runs them all)."""
+        trace = current_trace.get()
+        if trace is not None:
+            # Part of a request already being traced, e.g. a nested chain.
+            return self._walk_traced(request, trace, level)
+        if self._tracer is not None:
+            trace = self._tracer.start(request)
+            if trace is not None:
+                token = current_trace.set(trace)
+                try:
+                    result = self._walk_traced(request, trace, level)
+                finally:
+                    current_trace.reset(token)
+                self._tracer.finish(trace, result[1])
+                return result
+        metrics = self._metrics
+        handler = self
+        while handler is not None:
+            if level is not None and _sheds(handler, level):
+                handler = handler.successor()
+                continue
+            if metrics is None:
+                outcome = handler.process(request)
+            else:
+                start = perf_counter_ns()
+                outcome = handler.process(request)
+                metrics.record(handler, outcome is Outcome.HANDLED, perf_counter_ns() - start)
+            if outcome is Outcome.HANDLED:
+                return outcome, request
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            handler = handler.successor()
+        return Outcome.PASS, request
+
+    def _walk_traced(self, request, trace, level):
+        """_walk() for a traced request: record a Span for every hop."""
+        metrics = self._metrics
+        handler = self
+        while handler is not None:
+            if level is not None and _sheds(handler, level):
+                handler = handler.successor()
+                continue
+            start = perf_counter_ns()
+            outcome = handler.process(request)
+            elapsed = perf_counter_ns() - start
+            handled = outcome is Outcome.HANDLED
+            if metrics is not None:
+                metrics.record(handler, handled, elapsed)
+            request_in = request
+            if not handled and outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            trace.record(handler, elapsed, request_in, request, handled)
+            if handled:
+                return outcome, request
+            handler = handler.successor()
+        return Outcome.PASS, request
+
+    def handle_many(self, requests):
+        """Handle a batch of requests and return them as they left the chain, in input order.
+
+        Each hop sees the whole batch through process_many(). A NumPy array takes the
+        columnar path instead: hops that implement process_array() work on the whole
+        array at once, and an array is returned.
+        """
+        return self._handle_many(requests, None)
+
+    def _handle_many(self, requests, level):
+        """handle_many(), skipping every hop that sheds at degradation level `level`."""
+        if np is not None and isinstance(requests, np.ndarray):
+            return self._handle_array(requests, level)
+        return self._walk_many(self, list(requests), level)
+
+    def _walk_many(self, handler, results, level):
+        """The handle_many() loop over a list, starting at handler and measured with this chain's metrics."""
+        active = range(len(results))
+        metrics = self._metrics
+        while handler is not None and active:
+            if level is not None and _sheds(handler, level):
+                handler = handler.successor()
+                continue
+            start = 0 if metrics is None else perf_counter_ns()
+            outcomes = handler.process_many([results[index] for index in active])
+            if metrics is not None:
+                elapsed = perf_counter_ns() - start
+                handled = sum(1 for outcome in outcomes if outcome is Outcome.HANDLED)
+                if handled:
+                    metrics.record(handler, True, elapsed * handled // len(active), handled)
+                if handled < len(active):
+                    passed = len(active) - handled
+                    metrics.record(handler, False, elapsed * passed // len(active), passed)
+            remaining = []
+            for index, outcome in zip(active, outcomes):
+                if outcome is Outcome.HANDLED:
+                    continue
+                if outcome is not Outcome.PASS and outcome is not None:
+                    results[index] = outcome
+                remaining.append(index)
+            active = remaining
+            handler = handler.successor()
+        return results
+
+    def _handle_array(self, column, level):
+        """handle_many() for a NumPy array: vectorized hops while they last, then per element."""
+        metrics = self._metrics
+        handler = self
+        while handler is not None:
+            if level is not None and _sheds(handler, level):
+                handler = handler.successor()
+                continue
+            start = 0 if metrics is None else perf_counter_ns()
+            outcome = handler.process_array(column)
+            if outcome is NotImplemented:
+                results = self._walk_many(handler, column.tolist(), level)
+                return np.array(results, dtype=object if column.dtype == object else None)
+            if metrics is not None and len(column):
+                metrics.record(handler, False, perf_counter_ns() - start, len(column))
+            if outcome is not Outcome.PASS and outcome is not None:
+                column = outcome
+            handler = handler.successor()
+        return column
+
+    def fuse(self):
+        """Collapse the chain from this handler into one callable: request -> handle(request).
+
+        The hops are looked up once, pure pass-through decorators are dropped, and the
+        remaining process() methods run in a single loop with no successor() or
+        decorator delegation per request. The result is a snapshot: later set_next()
+        calls do not affect it.
+        """
+        steps = []
+        seen = set()
+        handler = self
+        while handler is not None:
+            if id(handler) in seen:
+                raise ValueError("chain contains a cycle")
+            seen.add(id(handler))
+            if type(handler).process is not HandlerDecorator.process:
+                steps.append(handler.process)
+            handler = handler.successor()
+        steps = tuple(steps)
+        handled, passed = Outcome.HANDLED, Outcome.PASS
+
+        def fused(request):
+            for step in steps:
+                outcome = step(request)
+                if outcome is handled:
+                    break
+                if outcome is not passed and outcome is not None:
+                    request = outcome
+            return request
+
+        return fused
+
+    def stream(self, requests, batch_size=1):
+        """Lazily yield the result of handling each request from an iterable, in order.
+
+        Requests are pulled one batch at a time, so memory stays constant however long
+        (or unbounded) the input is. A batch_size above 1 routes each chunk through
+        handle_many().
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if batch_size == 1:
+            handle = self.handle
+            for request in requests:
+                yield handle(request)
+            return
+        requests = iter(requests)
+        while True:
+            batch = list(islice(requests, batch_size))
+            if not batch:
+                return
+            yield from self.handle_many(batch)
+
     def get_output(self, request):
-        """Method to get output for the given request."""
-        output = []
-        self._output = output
-        self.handle(request)
-        return "\n".join(output)
+        """Handle the request and return the output the chain emitted for it."""
+        with capture_output() as capture:
+            self.handle(request)
+            return capture.getvalue()
 
 
 # Concrete Handlers
 class ConcreteHandlerA(Handler):
-    def handle(self, request):
-        """Process the request in Handler A and pass to next if available."""
-        logger.info(f"Handler A processing request: {request}")
-        if self._next_handler:
-            self._next_handler.handle(request)
+    __slots__ = ()
+    independent = True
+
+    def process(self, request):
+        """Process the request in Handler A and pass it on."""
+        self._sink.emit(INFO, "Handler A processing request: %s", loggable(request))
+        return Outcome.PASS
+
+    def process_many(self, requests):
+        """Process the batch in Handler A and pass it on."""
+        sink = self._sink
+        if sink.enabled(INFO):
+            for request in requests:
+                sink.emit(INFO, "Handler A processing request: %s", loggable(request))
+        return [Outcome.PASS] * len(requests)
+
+    def process_array(self, requests):
+        """Process the array in Handler A and pass it on."""
+        self.process_many(requests)
+        return Outcome.PASS
 
 
 class ConcreteHandlerB(Handler):
-    def handle(self, request):
-        """Process the request in Handler B and pass to next if available."""
-        logger.info(f"Handler B processing request: {request}")
-        if self._next_handler:
-            self._next_handler.handle(request)
+    __slots__ = ()
+    independent = True
+
+    def process(self, request):
+        """Process the request in Handler B and pass it on."""
+        self._sink.emit(INFO, "Handler B processing request: %s", loggable(request))
+        return Outcome.PASS
+
+    def process_many(self, requests):
+        """Process the batch in Handler B and pass it on."""
+        sink = self._sink
+        if sink.enabled(INFO):
+            for request in requests:
+                sink.emit(INFO, "Handler B processing request: %s", loggable(request))
+        return [Outcome.PASS] * len(requests)
+
+    def process_array(self, requests):
+        """Process the array in Handler B and pass it on."""
+        self.process_many(requests)
+        return Outcome.PASS
 
 
 # Base Handler Decorator
 class HandlerDecorator(Handler):
-    def __init__(self, handler):
-        super().__init__()
+    __slots__ = ("_handler",)
+
+    def __init__(self, handler, sink=None):
+        super().__init__(sink)
         self._handler = handler
 
     def set_next(self, handler):
@@ -56,37 +417,75 @@ class HandlerDecorator(Handler):
         self._handler.set_next(handler)
         return handler
 
-    def handle(self, request):
-        """Delegate the handling to the decorated handler."""
-        self._handler.handle(request)
+    def successor(self):
+        """The decorated handler runs right after the decorator."""
+        return self._handler
+
+    def process(self, request):
+        """Pass the request on to the decorated handler unchanged."""
+        return Outcome.PASS
+
+    def process_array(self, requests):
+        """Pass the array on to the decorated handler unchanged."""
+        return Outcome.PASS
 
 
 # Concrete Decorators
 class LoggingDecorator(HandlerDecorator):
-    def handle(self, request):
+    __slots__ = ()
+    shed_level = 1
+
+    def process(self, request):
         """Log the request before passing it to the next handler."""
-        logger.info(f"Logging request: {request}")
-        super().handle(request)
+        self._sink.emit(INFO, "Logging request: %s", loggable(request))
+        return Outcome.PASS
+
+    def process_many(self, requests):
+        """Log every request in the batch before passing it to the next handler."""
+        sink = self._sink
+        if sink.enabled(INFO):
+            for request in requests:
+                sink.emit(INFO, "Logging request: %s", loggable(request))
+        return [Outcome.PASS] * len(requests)
+
+    def process_array(self, requests):
+        """Log every request in the array before passing it to the next handler."""
+        self.process_many(requests)
+        return Outcome.PASS
 
 
 class UppercaseDecorator(HandlerDecorator):
-    def handle(self, request):
+    __slots__ = ()
+
+    def process(self, request):
         """Convert the request to uppercase and then pass it to the next handler."""
-        request = request.upper()
-        super().handle(request)
+        return uppercase(request)
+
+    def process_many(self, requests):
+        """Convert the batch to uppercase and then pass it to the next handler."""
+        return [uppercase(request) for request in requests]
+
+    def process_array(self, requests):
+        """Convert a str or bytes array to uppercase in one vectorized call."""
+        if requests.dtype.kind not in "US":
+            return NotImplemented
+        return np.char.upper(requests)
 
 
 # Main function to demonstrate functionality
 def main():
+    # The chain writes nowhere itself; get_output() captures its lines and they are logged once below.
+    sink = NullSink()
+
     # Create concrete handlers
-    handler_a = ConcreteHandlerA()
-    handler_b = ConcreteHandlerB()
+    handler_a = ConcreteHandlerA(sink=sink)
+    handler_b = ConcreteHandlerB(sink=sink)
 
     # Set up the chain of responsibility
     handler_a.set_next(handler_b)
 
     # Decorate handlers with logging and uppercase functionality
-    decorated_handler_a = LoggingDecorator(UppercaseDecorator(handler_a))
+    decorated_handler_a = LoggingDecorator(UppercaseDecorator(handler_a), sink=sink)
 
     # List of requests to process
     requests = ["request 1", "request 2"]
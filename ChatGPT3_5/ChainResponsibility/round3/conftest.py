@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# chain_metrics.py, shared with the other chain rounds, lives in common/ at the repository root.
+sys.path.append(str(Path(__file__).resolve().parents[3] / "common"))
+
+from code import ConcreteHandlerA, ConcreteHandlerB, LoggingDecorator, UppercaseDecorator  # noqa: E402
+from sinks import NullSink  # noqa: E402
+
+
+class FakeClock:
+    """Clock that only moves when a test sets `now`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def decorated_chain():
+    """Logging -> uppercase -> A -> B, writing to NullSinks until a test sets its own."""
+    handler_a = ConcreteHandlerA(sink=NullSink())
+    handler_a.set_next(ConcreteHandlerB(sink=NullSink()))
+    return LoggingDecorator(UppercaseDecorator(handler_a), sink=NullSink())
@@ -0,0 +1,202 @@
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+# Marks the end of the input on a stage queue.
+_DONE = object()
+
+_HANDLED, _PASS, _TRANSFORMED = "HANDLED", "PASS", None
+
+
+def _kind(outcome):
+    """Classify what process() returned: _HANDLED, _PASS or _TRANSFORMED.
+
+    Outcomes are matched by member name rather than identity, so chains built from
+    any round's own Outcome enum run through the same pipeline.
+    """
+    if outcome is None:
+        return _PASS
+    if isinstance(outcome, Enum) and outcome.name in (_HANDLED, _PASS):
+        return outcome.name
+    return _TRANSFORMED
+
+# The stage a process-pool worker runs, installed once per worker process.
+_process_stage = None
+
+
+def _install_stage(stage):
+    global _process_stage
+    _process_stage = stage
+
+
+def _run_installed_stage(request):
+    outcome = _process_stage.process(request)
+    if _kind(outcome) == _PASS and isinstance(request, bytearray):
+        # The stage may have changed the buffer in place, but only this process's
+        # copy of it; send the buffer back so the change reaches the next stage.
+        return request
+    return outcome
+
+
+class _Failure:
+    """Carries an exception raised by a stage to the caller of map()."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def chain_stages(head):
+    """Return the hops of a chain in order, following successor() from head."""
+    stages = []
+    seen = set()
+    handler = head
+    while handler is not None:
+        if id(handler) in seen:
+            raise ValueError("chain contains a cycle")
+        seen.add(id(handler))
+        stages.append(handler)
+        handler = handler.successor()
+    return stages
+
+
+class StagedPipeline:
+    """Run a set_next chain as a pipeline with its own worker pool per hop.
+
+    Every handler and decorator in the chain becomes a stage. Stages are connected by
+    bounded queues, so a slow stage pushes back on the ones in front of it instead of
+    letting work pile up. With executor="process" each stage runs in its own process
+    pool, which lets CPU-heavy handlers use every core; the handlers must be picklable.
+    """
+
+    def __init__(self, head, workers=1, queue_size=64, executor="thread"):
+        if executor not in ("thread", "process"):
+            raise ValueError("executor must be 'thread' or 'process'")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self._stages = chain_stages(head)
+        if isinstance(workers, int):
+            workers = [workers] * len(self._stages)
+        workers = list(workers)
+        if len(workers) != len(self._stages) or min(workers, default=1) < 1:
+            raise ValueError("workers must be a positive count or one count per stage")
+        self._workers = workers
+        self._queue_size = queue_size
+        self._executor = executor
+
+    @property
+    def stages(self):
+        return tuple(self._stages)
+
+    def map(self, requests):
+        """Yield the result of handling each request, in input order.
+
+        Results are the same as head.handle(request) would return. Requests are pulled
+        from the iterable only as fast as the pipeline drains them.
+        """
+        stop = threading.Event()
+        # Requests fed but not yet yielded. Bounding them also bounds the results
+        # held back for reordering when one request is slower than those behind it.
+        window = threading.Semaphore(self._queue_size * sum(self._workers))
+        queues = [queue.Queue(self._queue_size) for _ in self._stages]
+        output = queue.Queue(self._queue_size)
+        pools = []
+        threads = []
+
+        def put(target, item):
+            # Block for backpressure, but give up once the consumer has gone away.
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.05)
+                    return
+                except queue.Full:
+                    pass
+
+        def feed():
+            try:
+                for index, request in enumerate(requests):
+                    while not window.acquire(timeout=0.05):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    put(queues[0], (index, request))
+            except BaseException as error:
+                put(output, (-1, _Failure(error)))
+            for _ in range(self._workers[0]):
+                put(queues[0], _DONE)
+
+        def run_stage(position, call):
+            inbox = queues[position]
+            last = position == len(self._stages) - 1
+            outbox = output if last else queues[position + 1]
+            while not stop.is_set():
+                try:
+                    item = inbox.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                index, request = item
+                try:
+                    outcome = call(request)
+                except BaseException as error:
+                    put(output, (index, _Failure(error)))
+                    continue
+                kind = _kind(outcome)
+                if kind == _HANDLED:
+                    put(output, (index, request))
+                    continue
+                if kind is _TRANSFORMED:
+                    request = outcome
+                put(outbox, (index, request))
+            with finished_lock:
+                finished[position] += 1
+                stage_done = finished[position] == self._workers[position]
+            if stage_done:
+                # The last worker out tells the next stage, or the collector, that input has ended.
+                if last:
+                    put(output, _DONE)
+                else:
+                    for _ in range(self._workers[position + 1]):
+                        put(queues[position + 1], _DONE)
+
+        finished_lock = threading.Lock()
+        finished = [0] * len(self._stages)
+        try:
+            for position, stage in enumerate(self._stages):
+                call = stage.process
+                if self._executor == "process":
+                    pool = ProcessPoolExecutor(
+                        self._workers[position],
+                        initializer=_install_stage,
+                        initargs=(stage,),
+                    )
+                    pools.append(pool)
+                    call = lambda request, pool=pool: pool.submit(_run_installed_stage, request).result()
+                for _ in range(self._workers[position]):
+                    threads.append(threading.Thread(target=run_stage, args=(position, call), daemon=True))
+            threads.append(threading.Thread(target=feed, daemon=True))
+            for thread in threads:
+                thread.start()
+
+            pending = {}
+            next_index = 0
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    break
+                index, result = item
+                if isinstance(result, _Failure):
+                    raise result.error
+                pending[index] = result
+                while next_index in pending:
+                    window.release()
+                    yield pending.pop(next_index)
+                    next_index += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for pool in pools:
+                pool.shutdown()
@@ -0,0 +1,151 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from enum import Enum
+
+from code import HandlerDecorator, Outcome
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class _Saturated(Exception):
+    """Every worker thread is busy with an earlier call."""
+
+
+class CircuitBreakerDecorator(HandlerDecorator):
+    """Guard one hop with a time budget and a circuit breaker.
+
+    Unlike the other decorators this one replaces the hop it wraps: process() runs the
+    wrapped handler's process() and successor() skips straight to the wrapped handler's
+    successor. A call that raises or runs past timeout seconds counts as a failure and
+    the hop returns fallback (by default the request is passed on unchanged).
+
+    After failure_threshold consecutive failures the breaker opens and the hop is
+    skipped without calling the handler. Once reset_timeout seconds have passed it
+    half-opens and lets a single probe through: success closes it, failure opens it
+    again. State changes, failures, timeouts and skipped calls are counted as events
+    in metrics (a ChainMetrics), keyed by this decorator.
+
+    Python cannot interrupt a running call, so a call that times out keeps running on
+    the decorator's worker thread in the background. Calls never queue behind it: when
+    all max_workers threads are busy, a call fails at once as "saturated".
+    """
+
+    __slots__ = ("_timeout", "_failure_threshold", "_reset_timeout", "_fallback", "_clock", "_breaker_metrics",
+                 "_state", "_failures", "_opened_at", "_probing", "_lock", "_executor", "_max_workers", "_busy")
+
+    def __init__(self, handler, timeout=None, failure_threshold=5, reset_timeout=30.0, fallback=Outcome.PASS,
+                 metrics=None, clock=time.monotonic, max_workers=4, sink=None):
+        super().__init__(handler, sink)
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self._timeout = timeout
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._fallback = fallback
+        self._clock = clock
+        self._breaker_metrics = metrics
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+        self._busy = 0
+
+    @property
+    def state(self):
+        """The breaker's BreakerState."""
+        return self._state
+
+    def successor(self):
+        """The wrapped handler's successor: the wrapped hop runs inside process()."""
+        return self._handler.successor()
+
+    def _event(self, event):
+        if self._breaker_metrics is not None:
+            self._breaker_metrics.record_event(self, event)
+
+    def _transition(self, state):
+        # Called with the lock held.
+        self._event(f"{self._state.value}->{state.value}")
+        self._state = state
+
+    def _allow(self):
+        """Decide whether this call may reach the handler; True means it is the half-open probe or closed."""
+        with self._lock:
+            if self._state is BreakerState.OPEN:
+                if self._clock() - self._opened_at < self._reset_timeout:
+                    return False
+                self._transition(BreakerState.HALF_OPEN)
+            if self._state is BreakerState.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def _succeeded(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state is not BreakerState.CLOSED:
+                self._transition(BreakerState.CLOSED)
+
+    def _failed(self, event):
+        with self._lock:
+            self._event(event)
+            self._failures += 1
+            half_open = self._state is BreakerState.HALF_OPEN
+            self._probing = False
+            if half_open or (self._state is BreakerState.CLOSED and self._failures >= self._failure_threshold):
+                self._opened_at = self._clock()
+                self._transition(BreakerState.OPEN)
+
+    def _release(self, future):
+        with self._lock:
+            self._busy -= 1
+
+    def _call(self, request):
+        """Run the wrapped hop; with a timeout, on a free worker thread or raise _Saturated."""
+        if self._timeout is None:
+            return self._handler.process(request)
+        with self._lock:
+            if self._busy >= self._max_workers:
+                raise _Saturated
+            self._busy += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix="breaker")
+        # Run in a copy of the caller's context, so output capture and tracing follow the call.
+        future = self._executor.submit(contextvars.copy_context().run, self._handler.process, request)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(self._timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def process(self, request):
+        """Run the wrapped hop within its budget, or skip it while the breaker is open."""
+        if not self._allow():
+            self._event("skipped")
+            return self._fallback
+        try:
+            outcome = self._call(request)
+        except FutureTimeoutError:
+            self._failed("timeout")
+            return self._fallback
+        except _Saturated:
+            self._failed("saturated")
+            return self._fallback
+        except Exception:
+            self._failed("failure")
+            return self._fallback
+        self._succeeded()
+        return outcome
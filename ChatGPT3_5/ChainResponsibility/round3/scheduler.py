@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+
+_NO_DEADLINE = float("inf")
+
+
+class Priority(IntEnum):
+    """Priority classes, most urgent first."""
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before a handler ran; it was dropped."""
+
+
+class SchedulerClosed(Exception):
+    """The scheduler was closed before the request ran."""
+
+
+class RequestScheduler:
+    """Queue requests in front of a chain and run the most urgent one first.
+
+    handle is the chain's entry point, e.g. Handler.handle (or handle_request on a
+    ChainOfResponsibility). Pending requests sit in a heap ordered by priority class,
+    then earliest deadline, then arrival, so latency-sensitive traffic never waits
+    behind queued bulk work. A request whose deadline has passed when it reaches the
+    front is dropped without running any handler: its future fails with
+    DeadlineExceeded.
+
+    With workers=0 no threads are started and run_pending() drains the queue on the
+    calling thread.
+    """
+
+    def __init__(self, handle, workers=1, clock=time.monotonic):
+        if workers < 0:
+            raise ValueError("workers must not be negative")
+        self._handle = handle
+        self._clock = clock
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.completed = 0
+        self.dropped = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"scheduler-{n}", daemon=True) for n in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, request, priority=Priority.NORMAL, deadline=None, timeout=None):
+        """Queue a request and return a Future for the chain's result.
+
+        deadline is an absolute time on the scheduler's clock; timeout is a
+        convenience for clock() + timeout. Give at most one of them.
+        """
+        if deadline is not None and timeout is not None:
+            raise ValueError("give either deadline or timeout, not both")
+        if timeout is not None:
+            deadline = self._clock() + timeout
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise SchedulerClosed("scheduler is closed")
+            entry = (int(priority), _NO_DEADLINE if deadline is None else deadline, next(self._sequence), future, request)
+            heapq.heappush(self._heap, entry)
+            self._condition.notify()
+        return future
+
+    def __len__(self):
+        """Number of requests waiting to run."""
+        with self._condition:
+            return len(self._heap)
+
+    def _run(self, entry):
+        _, deadline, _, future, request = entry
+        if not future.set_running_or_notify_cancel():
+            return
+        if self._clock() > deadline:
+            with self._condition:
+                self.dropped += 1
+            future.set_exception(DeadlineExceeded(request))
+            return
+        try:
+            result = self._handle(request)
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        with self._condition:
+            self.completed += 1
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._heap and not self._closed:
+                    self._condition.wait()
+                if not self._heap:
+                    return
+                entry = heapq.heappop(self._heap)
+            self._run(entry)
+
+    def run_pending(self):
+        """Run every queued request on the calling thread, most urgent first. Return how many ran or were dropped."""
+        count = 0
+        while True:
+            with self._condition:
+                if not self._heap:
+                    return count
+                entry = heapq.heappop(self._heap)
+            self._run(entry)
+            count += 1
+
+    def close(self, wait=True, cancel_pending=False):
+        """Stop accepting requests. Workers finish the queue unless cancel_pending is set."""
+        with self._condition:
+            self._closed = True
+            if cancel_pending:
+                pending, self._heap = self._heap, []
+            else:
+                pending = []
+            self._condition.notify_all()
+        for entry in pending:
+            # Futures the caller already cancelled are left as they are.
+            if entry[3].set_running_or_notify_cancel():
+                entry[3].set_exception(SchedulerClosed("scheduler closed before the request ran"))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
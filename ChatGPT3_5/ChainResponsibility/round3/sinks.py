@@ -0,0 +1,185 @@
+import logging
+import queue
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import INFO
+
+# Capture buffer for the request running in the current thread or task, if any.
+_current_capture = ContextVar("current_capture", default=None)
+
+# Idle capture buffers kept per thread for reuse.
+_local = threading.local()
+
+
+# Base Sink class for handler output
+class Sink(ABC):
+    """Where chain handlers send their output.
+
+    Handlers call emit(level, message, *args) with a %-style message. Nothing is
+    formatted until a sink actually writes the record, and records below the sink's
+    level are dropped before any formatting happens. Inside capture_output() every
+    sink also copies records into the active capture buffer.
+    """
+
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def enabled(self, level):
+        """Return True if records at this level would be written or captured."""
+        return level >= self.level or _current_capture.get() is not None
+
+    def emit(self, level, message, *args):
+        """Write a record if its level is enabled."""
+        capture = _current_capture.get()
+        if capture is not None:
+            capture.write(level, message, args)
+        if level >= self.level:
+            self.write(level, message, args)
+
+    @abstractmethod
+    def write(self, level, message, args):
+        """Write one record. `message % args` gives the text."""
+        pass
+
+
+class NullSink(Sink):
+    """Discards everything that is not being captured, without formatting it."""
+
+    def enabled(self, level):
+        return _current_capture.get() is not None
+
+    def emit(self, level, message, *args):
+        capture = _current_capture.get()
+        if capture is not None:
+            capture.write(level, message, args)
+
+    def write(self, level, message, args):
+        pass
+
+
+class BufferedSink(Sink):
+    """Keeps records in memory, unformatted, until they are read."""
+
+    def __init__(self, level=INFO, maxlen=None):
+        super().__init__(level)
+        self._records = deque(maxlen=maxlen)
+
+    def write(self, level, message, args):
+        self._records.append((level, message, args))
+
+    def lines(self):
+        """Return the buffered records as text, oldest first."""
+        return [message % args if args else message for _, message, args in self._records]
+
+    def getvalue(self):
+        return "\n".join(self.lines())
+
+    def clear(self):
+        self._records.clear()
+
+
+class QueueSink(Sink):
+    """Hands records to a background thread that formats and writes them.
+
+    The handler's hot path only pays for a queue put. Call flush() to wait for
+    everything queued so far, and close() to stop the thread.
+    """
+
+    def __init__(self, stream=None, level=INFO):
+        super().__init__(level)
+        self._stream = stream if stream is not None else sys.stdout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def write(self, level, message, args):
+        self._queue.put((message, args))
+
+    def _drain(self):
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                message, args = record
+                self._stream.write((message % args if args else message) + "\n")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every record queued so far has been written."""
+        self._queue.join()
+        self._stream.flush()
+
+    def close(self):
+        """Write what is queued and stop the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._stream.flush()
+
+
+class LoggerSink(Sink):
+    """Forwards records to a logging.Logger, which also formats lazily."""
+
+    def __init__(self, logger):
+        super().__init__(logging.NOTSET)
+        self._logger = logger
+
+    def enabled(self, level):
+        return self._logger.isEnabledFor(level) or _current_capture.get() is not None
+
+    def emit(self, level, message, *args):
+        capture = _current_capture.get()
+        if capture is not None:
+            capture.write(level, message, args)
+        if self._logger.isEnabledFor(level):
+            # Attribute the record to the handler that emitted it, not to the sink.
+            self._logger.log(level, message, *args, stacklevel=2)
+
+    def write(self, level, message, args):
+        self._logger.log(level, message, *args)
+
+
+class OutputCapture:
+    """Bounded buffer that collects the text emitted while handling one request."""
+
+    def __init__(self, max_lines=1000, level=INFO):
+        self.level = level
+        self._lines = deque(maxlen=max_lines)
+
+    def write(self, level, message, args):
+        if level >= self.level:
+            self._lines.append(message % args if args else message)
+
+    def getvalue(self):
+        """Return the captured lines joined by newlines. Only the newest max_lines are kept."""
+        return "\n".join(self._lines)
+
+    def clear(self):
+        self._lines.clear()
+
+
+@contextmanager
+def capture_output():
+    """Capture everything emitted through any sink in this context.
+
+    Yields an OutputCapture borrowed from a per-thread pool and returns it, cleared,
+    when the block ends. Captures are scoped with a ContextVar, so concurrent threads
+    and asyncio tasks each see only their own output, and nested captures don't mix.
+    """
+    idle = getattr(_local, "idle", None)
+    if idle is None:
+        idle = _local.idle = []
+    capture = idle.pop() if idle else OutputCapture()
+    token = _current_capture.set(capture)
+    try:
+        yield capture
+    finally:
+        _current_capture.reset(token)
+        capture.clear()
+        idle.append(capture)
@@ -0,0 +1,225 @@
+from code import Outcome
+from pipeline import chain_stages
+
+
+def _run(runs, request):
+    """Run the request through the process() methods of each run of handlers, in order."""
+    for handlers in runs:
+        for handler in handlers:
+            outcome = handler.process(request)
+            if outcome is Outcome.HANDLED:
+                return request
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+    return request
+
+
+class ChainTemplate:
+    """An immutable, named sequence of hops that many tenant chains share.
+
+    Only the process() method of each hop is used: the template decides the order, so
+    set_next() links between the handlers are ignored. Build one from an existing
+    chain with from_chain(), then derive tenant variants with tenant().
+    """
+
+    __slots__ = ("_names", "_handlers", "_positions")
+
+    def __init__(self, hops):
+        """hops is an iterable of (name, handler) pairs. Names must be unique."""
+        names = []
+        handlers = []
+        positions = {}
+        for name, handler in hops:
+            if name in positions:
+                raise ValueError(f"duplicate hop name: {name!r}")
+            positions[name] = len(names)
+            names.append(name)
+            handlers.append(handler)
+        self._names = tuple(names)
+        self._handlers = tuple(handlers)
+        self._positions = positions
+
+    @classmethod
+    def from_chain(cls, head, names=None):
+        """Build a template from the hops of a set_next chain, following successor().
+
+        Hops are named after their class unless names are given; repeated class names
+        get a numeric suffix ("ConcreteHandlerA", "ConcreteHandlerA#2", ...).
+        """
+        handlers = chain_stages(head)
+        if names is None:
+            names = []
+            counts = {}
+            for handler in handlers:
+                base = type(handler).__name__
+                counts[base] = counts.get(base, 0) + 1
+                names.append(base if counts[base] == 1 else f"{base}#{counts[base]}")
+        elif len(names) != len(handlers):
+            raise ValueError("names must give one name per hop")
+        return cls(zip(names, handlers))
+
+    @property
+    def names(self):
+        """The hop names, in chain order."""
+        return self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __getitem__(self, name):
+        return self._handlers[self._positions[name]]
+
+    def handle(self, request):
+        """Run the request through the template as is and return it as it left the chain."""
+        return _run((self._handlers,), request)
+
+    def tenant(self):
+        """Return a tenant chain with no changes, sharing every hop with the template."""
+        return TenantChain(self)
+
+
+class TenantChain:
+    """A tenant's view of a ChainTemplate: the shared hops plus a copy-on-write overlay.
+
+    The overlay records only what the tenant changed - replaced, removed and added hops
+    - so memory grows with the number of changes, not with the chain length. Tenant
+    chains are immutable: replace(), remove() and add() return a new TenantChain and
+    leave this one, the template and every other tenant untouched.
+    """
+
+    __slots__ = ("_template", "_replaced", "_removed", "_added", "_plan")
+
+    def __init__(self, template, replaced=None, removed=frozenset(), added=None):
+        self._template = template
+        # name -> handler used instead of the template's (or an added) hop
+        self._replaced = {} if replaced is None else replaced
+        self._removed = removed
+        # anchor name (None for the front) -> ((name, handler), ...) inserted after it
+        self._added = {} if added is None else added
+        # Built by handle() on first use; see _build_plan().
+        self._plan = None
+
+    @property
+    def template(self):
+        """The ChainTemplate this tenant chain overlays."""
+        return self._template
+
+    @property
+    def changes(self):
+        """How many hops this tenant replaced, removed or added."""
+        return len(self._replaced) + len(self._removed) + sum(len(hops) for hops in self._added.values())
+
+    def _added_names(self):
+        return {name for hops in self._added.values() for name, _ in hops}
+
+    def __contains__(self, name):
+        if name in self._removed:
+            return False
+        return name in self._template or name in self._added_names()
+
+    def _check_present(self, name):
+        if name not in self:
+            raise KeyError(name)
+
+    def replace(self, name, handler):
+        """Return a tenant chain that runs handler in place of the hop called name."""
+        self._check_present(name)
+        replaced = dict(self._replaced)
+        replaced[name] = handler
+        return TenantChain(self._template, replaced, self._removed, self._added)
+
+    def remove(self, name):
+        """Return a tenant chain without the hop called name."""
+        self._check_present(name)
+        replaced = self._replaced
+        if name in replaced:
+            replaced = {key: value for key, value in replaced.items() if key != name}
+        # Removed hops stay in the overlay as anchors, so hops added after them keep their place.
+        return TenantChain(self._template, replaced, self._removed | {name}, self._added)
+
+    def add(self, name, handler, after=None):
+        """Return a tenant chain with handler inserted after the hop called after.
+
+        With after=None the hop goes to the front of the chain. Hops added after the
+        same hop run in the order they were added. The name must not be used by a
+        template hop or another added hop, even a removed one.
+        """
+        if name in self._template or name in self._added_names():
+            raise ValueError(f"duplicate hop name: {name!r}")
+        if after is not None:
+            self._check_present(after)
+        added = dict(self._added)
+        added[after] = added.get(after, ()) + ((name, handler),)
+        return TenantChain(self._template, self._replaced, self._removed, added)
+
+    def _hops(self, anchor):
+        """Yield (name, handler) for the hops added after anchor, and the hops after those."""
+        for name, handler in self._added.get(anchor, ()):
+            if name not in self._removed:
+                yield name, self._replaced.get(name, handler)
+            yield from self._hops(name)
+
+    def hops(self):
+        """Yield (name, handler) for every hop of the tenant chain, in order."""
+        template = self._template
+        if not (self._replaced or self._removed or self._added):
+            yield from zip(template._names, template._handlers)
+            return
+        yield from self._hops(None)
+        for name, handler in zip(template._names, template._handlers):
+            if name not in self._removed:
+                yield name, self._replaced.get(name, handler)
+            # Hops added after a removed hop stay where it was.
+            yield from self._hops(name)
+
+    @property
+    def names(self):
+        """The hop names, in chain order."""
+        return tuple(name for name, _ in self.hops())
+
+    def _build_plan(self):
+        """Return the chain as a tuple of steps, in order.
+
+        A step is either a slice of the template's handlers that the tenant left
+        untouched, or a tuple of the overlay handlers that run between two such
+        slices. Each change adds at most two steps, so the plan stays small however
+        long the template is.
+        """
+        template = self._template
+        handlers = template._handlers
+        replaced, removed, added = self._replaced, self._removed, self._added
+        steps = []
+        overlay = [handler for _, handler in self._hops(None)]
+        start = 0
+        for position, name in enumerate(template._names):
+            if name not in replaced and name not in removed and name not in added:
+                continue
+            if start < position:
+                if overlay:
+                    steps.append(tuple(overlay))
+                    overlay = []
+                steps.append(slice(start, position))
+            if name not in removed:
+                overlay.append(replaced.get(name, handlers[position]))
+            overlay.extend(handler for _, handler in self._hops(name))
+            start = position + 1
+        if start < len(handlers):
+            if overlay:
+                steps.append(tuple(overlay))
+                overlay = []
+            steps.append(slice(start, len(handlers)))
+        if overlay:
+            steps.append(tuple(overlay))
+        return tuple(steps)
+
+    def handle(self, request):
+        """Run the request through the tenant chain and return it as it left the chain."""
+        plan = self._plan
+        if plan is None:
+            # Tenant chains are immutable, so the plan never goes stale.
+            plan = self._plan = self._build_plan()
+        handlers = self._template._handlers
+        return _run((handlers[step] if step.__class__ is slice else step for step in plan), request)
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from admission import AdmissionHandler, Overloaded, TokenBucket
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, LoggingDecorator, Outcome, UppercaseDecorator
+from sinks import BufferedSink
+from tracing import Tracer
+
+
+class Blocking(Handler):
+    """Handler that holds requests until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def process(self, request):
+        self.entered.release()
+        self.release.wait()
+        return Outcome.HANDLED
+
+
+def build_chain(head, sink):
+    handler_a = ConcreteHandlerA(sink=sink)
+    handler_a.set_next(ConcreteHandlerB(sink=sink))
+    head.set_next(LoggingDecorator(UppercaseDecorator(handler_a), sink=sink))
+    return head
+
+
+def test_token_bucket_refills_up_to_burst(clock):
+    """Test that the bucket allows a burst, then refills at its rate"""
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    clock.now = 1
+    assert bucket.try_acquire(2)
+    assert not bucket.try_acquire()
+    clock.now = 100
+    assert bucket.try_acquire(3)
+    assert not bucket.try_acquire()
+
+
+def test_rate_limit_rejects_immediately(clock):
+    """Test that requests beyond the rate are rejected without running the chain"""
+    sink = BufferedSink()
+    head = build_chain(AdmissionHandler(TokenBucket(rate=1, burst=2, clock=clock)), sink)
+
+    assert head.handle("a") == "A"
+    assert head.handle_many(["b"]) == ["B"]
+    with pytest.raises(Overloaded) as error:
+        head.handle("c")
+    assert error.value.reason == "rate"
+    with pytest.raises(Overloaded):
+        head.handle_many(["d", "e"])
+    assert len(sink.lines()) == 6
+    assert (head.admitted, head.rejected, head.in_flight) == (2, 3, 0)
+
+
+def test_concurrency_cap_and_auto_degradation():
+    """Test the in-flight cap, and that logging is shed while the chain is busy"""
+    sink = BufferedSink()
+    blocking = Blocking()
+    head = AdmissionHandler(max_concurrency=2, degrade_above=0)
+    head.set_next(LoggingDecorator(blocking, sink=sink))
+
+    first = threading.Thread(target=head.handle, args=("first",))
+    first.start()
+    blocking.entered.acquire()
+    second = threading.Thread(target=head.handle, args=("second",))
+    second.start()
+    blocking.entered.acquire()
+    assert head.in_flight == 2
+    with pytest.raises(Overloaded) as error:
+        head.handle("third")
+    assert error.value.reason == "concurrency"
+
+    blocking.release.set()
+    first.join()
+    second.join()
+    assert head.in_flight == 0
+    # Only the request admitted while nothing else was in flight was logged.
+    assert sink.lines() == ["Logging request: first"]
+
+
+def test_degradation_skips_optional_decorators_only():
+    """Test that degrading skips LoggingDecorator but keeps UppercaseDecorator"""
+    sink = BufferedSink()
+    head = build_chain(AdmissionHandler(), sink)
+    head.degrade(1)
+
+    assert head.handle("x") == "X"
+    assert head.handle_many(["y"]) == ["Y"]
+    assert sink.lines() == [
+        "Handler A processing request: X",
+        "Handler B processing request: X",
+        "Handler A processing request: Y",
+        "Handler B processing request: Y",
+    ]
+    head.degrade(0)
+    assert head.get_output("z").splitlines()[0] == "Logging request: z"
+    with pytest.raises(ValueError):
+        head.degrade(-1)
+
+
+def test_admitted_requests_keep_tracing_and_metrics():
+    """Test that an admission head traces and measures like any other head, shedding included"""
+    head = build_chain(AdmissionHandler(), BufferedSink())
+    tracer = head.enable_tracing(Tracer(sample_rate=1.0))
+    metrics = head.enable_metrics()
+    head.degrade(1)
+
+    assert head.handle("x") == "X"
+    (trace,) = tracer.traces
+    assert trace.path == ("AdmissionHandler", "UppercaseDecorator", "ConcreteHandlerA", "ConcreteHandlerB")
+
+    head.disable_tracing()
+    assert head.handle_many(["y", "z"]) == ["Y", "Z"]
+    seen = {type(stat.handler).__name__: stat.seen for stat in metrics.snapshot()}
+    assert seen == {"AdmissionHandler": 3, "UppercaseDecorator": 3, "ConcreteHandlerA": 3, "ConcreteHandlerB": 3}
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, Outcome, UppercaseDecorator
+from async_chain import (
+    AsyncHandler,
+    AsyncLoggingDecorator,
+    AsyncUppercaseDecorator,
+    ThreadedHandler,
+    handle_concurrently,
+)
+
+
+class SleepyHandler(AsyncHandler):
+    """Async handler that waits on fake I/O and tracks how many calls overlap."""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def process(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return f"{request}!"
+
+
+def test_async_decorators_wrap_sync_chain(caplog):
+    """Test that async decorators run in order around a sync handler chain"""
+    handler_a = ConcreteHandlerA()
+    handler_a.set_next(ConcreteHandlerB())
+    decorated = AsyncLoggingDecorator(AsyncUppercaseDecorator(handler_a))
+
+    with caplog.at_level(logging.INFO):
+        result = asyncio.run(decorated.handle("test request"))
+
+    assert result == "TEST REQUEST"
+    assert [record.getMessage() for record in caplog.records] == [
+        "Logging request: test request",
+        "Handler A processing request: TEST REQUEST",
+        "Handler B processing request: TEST REQUEST",
+    ]
+
+
+def test_sync_decorator_inside_async_chain():
+    """Test that a sync decorator can follow an async handler"""
+    sleepy = SleepyHandler()
+    sleepy.set_next(UppercaseDecorator(ConcreteHandlerA()))
+    assert asyncio.run(sleepy.handle("x")) == "X!"
+
+
+def test_handle_concurrently_respects_limit():
+    """Test that the driver overlaps requests but never exceeds the limit"""
+    sleepy = SleepyHandler()
+    requests = [str(i) for i in range(1000)]
+
+    results = asyncio.run(handle_concurrently(sleepy, requests, limit=50))
+
+    assert results == [f"{i}!" for i in range(1000)]
+    assert sleepy.max_in_flight == 50
+
+
+def test_handle_concurrently_rejects_bad_limit():
+    """Test that a limit below one is rejected"""
+    with pytest.raises(ValueError):
+        asyncio.run(handle_concurrently(SleepyHandler(), ["x"], limit=0))
+
+
+def test_handle_concurrently_cancels_other_workers_on_failure():
+    """Test that one failing request stops the rest instead of leaving them running"""
+    class FailFast(AsyncHandler):
+        def __init__(self):
+            super().__init__()
+            self.finished = []
+
+        async def process(self, request):
+            if request == "bad":
+                raise RuntimeError("boom")
+            await asyncio.sleep(0.2)
+            self.finished.append(request)
+            return Outcome.PASS
+
+    handler = FailFast()
+
+    async def run():
+        with pytest.raises(RuntimeError, match="boom"):
+            await handle_concurrently(handler, ["slow", "bad", "slow", "slow"], limit=4)
+        await asyncio.sleep(0.3)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert handler.finished == []
+
+
+def test_threaded_handler_does_not_block_loop():
+    """Test that a blocking sync chain runs off the event loop"""
+    class BlockingDecorator(UppercaseDecorator):
+        def process(self, request):
+            time.sleep(0.05)
+            return super().process(request)
+
+    threaded = ThreadedHandler(BlockingDecorator(ConcreteHandlerA()))
+    threaded.set_next(AsyncUppercaseDecorator(SleepyHandler()))
+
+    async def run():
+        start = time.perf_counter()
+        results = await handle_concurrently(threaded, ["a", "b", "c", "d"], limit=4)
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == ["A!", "B!", "C!", "D!"]
+    assert elapsed < 0.15
+
+
+def test_threaded_handler_stops_async_chain_when_sync_chain_handles():
+    """Test that a request handled inside the wrapped sync chain doesn't reach later async hops"""
+    class Stop(Handler):
+        def process(self, request):
+            return Outcome.HANDLED
+
+    reached = []
+
+    class Recorder(AsyncHandler):
+        async def process(self, request):
+            reached.append(request)
+            return Outcome.PASS
+
+    stopped = ThreadedHandler(Stop())
+    stopped.set_next(Recorder())
+    assert asyncio.run(stopped.handle("x")) == "x"
+    assert reached == []
+
+    passing = ThreadedHandler(UppercaseDecorator(ConcreteHandlerA()))
+    passing.set_next(Recorder())
+    assert asyncio.run(passing.handle("y")) == "Y"
+    assert reached == ["Y"]
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+
+from async_chain import AsyncHandler
+from broadcast import Broadcast
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, LoggingDecorator, Outcome, UppercaseDecorator
+from sinks import BufferedSink, NullSink, capture_output
+from tracing import current_trace
+
+
+class SlowObserver(Handler):
+    """Independent handler that sleeps and records what it saw."""
+    independent = True
+
+    def __init__(self, seen, delay=0.05):
+        super().__init__()
+        self.seen = seen
+        self.delay = delay
+
+    def process(self, request):
+        time.sleep(self.delay)
+        self.seen.append((request, threading.current_thread().name))
+        return Outcome.PASS
+
+
+class AsyncSlowObserver(AsyncHandler):
+    independent = True
+
+    def __init__(self, seen, delay=0.05):
+        super().__init__()
+        self.seen = seen
+        self.delay = delay
+
+    async def process(self, request):
+        await asyncio.sleep(self.delay)
+        self.seen.append(request)
+        return Outcome.PASS
+
+
+class Counter(Handler):
+    """Dependent handler that checks everything before it has finished."""
+
+    def __init__(self, seen, expected):
+        super().__init__()
+        self.seen = seen
+        self.expected = expected
+
+    def process(self, request):
+        return f"{request}:{len(self.seen) == self.expected}"
+
+
+def link(*hops):
+    for hop, successor in zip(hops, hops[1:]):
+        hop.set_next(successor)
+    return hops[0]
+
+
+def test_groups_follow_independence():
+    """Test that decorators stay barriers and the concrete handlers form one group"""
+    sink = BufferedSink()
+    handler_a = ConcreteHandlerA(sink=sink)
+    handler_b = handler_a.set_next(ConcreteHandlerB(sink=sink))
+    uppercase = UppercaseDecorator(handler_a)
+    logging_decorator = LoggingDecorator(uppercase, sink=sink)
+
+    with Broadcast(logging_decorator) as broadcast:
+        assert broadcast.groups == ((logging_decorator,), (uppercase,), (handler_a, handler_b))
+        assert broadcast.handle("test request") == "TEST REQUEST"
+    assert sink.lines()[:1] == ["Logging request: test request"]
+    assert sorted(sink.lines()[1:]) == [
+        "Handler A processing request: TEST REQUEST",
+        "Handler B processing request: TEST REQUEST",
+    ]
+
+
+def test_thread_pool_overlaps_independent_hops():
+    """Test that independent hops run concurrently and dependent ones wait for them"""
+    seen = []
+    observers = [SlowObserver(seen) for _ in range(4)]
+    head = UppercaseDecorator(link(*observers, Counter(seen, 4)))
+
+    with Broadcast(head, max_workers=4) as broadcast:
+        start = time.perf_counter()
+        result = broadcast.handle("x")
+        elapsed = time.perf_counter() - start
+    assert result == "X:True"
+    assert [request for request, _ in seen] == ["X"] * 4
+    assert len({thread for _, thread in seen}) == 4
+    assert elapsed < 0.15
+
+
+def test_asyncio_tasks_overlap_independent_hops():
+    """Test handle_async with async and sync independent hops side by side"""
+    seen = []
+    head = link(AsyncSlowObserver(seen), AsyncSlowObserver(seen), SlowObserver(seen), Counter(seen, 3))
+    broadcast = Broadcast(head)
+
+    start = time.perf_counter()
+    result = asyncio.run(broadcast.handle_async("y"))
+    assert time.perf_counter() - start < 0.12
+    assert result == "y:True"
+    assert len(seen) == 3
+
+
+def test_handled_stops_after_the_group_and_merge_is_pluggable():
+    """Test that HANDLED ends the broadcast after its group, and a custom merge combines transforms"""
+    class Stop(Handler):
+        independent = True
+
+        def process(self, request):
+            return Outcome.HANDLED
+
+    class Suffix(Handler):
+        independent = True
+
+        def __init__(self, suffix):
+            super().__init__()
+            self.suffix = suffix
+
+        def process(self, request):
+            return request + self.suffix
+
+    seen = []
+    assert Broadcast(link(Stop(), SlowObserver(seen, 0), Counter(seen, 1))).handle("z") == "z"
+    assert len(seen) == 1
+
+    hops = link(Suffix("1"), Suffix("2"))
+    assert Broadcast(hops).handle("r") == "r2"
+
+    def join(request, outcomes):
+        return request + "".join(outcome[len(request):] for outcome in outcomes)
+
+    assert Broadcast(hops, merge=join).handle("r") == "r12"
+
+
+def test_pool_threads_see_the_callers_context():
+    """Test that output capture and the active trace reach hops run on the thread pool"""
+    class TraceProbe(Handler):
+        independent = True
+
+        def __init__(self, seen):
+            super().__init__()
+            self.seen = seen
+
+        def process(self, request):
+            self.seen.append(current_trace.get())
+            return Outcome.PASS
+
+    handler_a = ConcreteHandlerA(sink=NullSink())
+    handler_a.set_next(ConcreteHandlerB(sink=NullSink()))
+    with Broadcast(handler_a) as broadcast, capture_output() as output:
+        broadcast.handle("bc")
+        captured = output.getvalue()
+    assert sorted(captured.splitlines()) == [
+        "Handler A processing request: bc",
+        "Handler B processing request: bc",
+    ]
+
+    seen = []
+    token = current_trace.set("trace")
+    try:
+        with Broadcast(link(TraceProbe(seen), TraceProbe(seen))) as broadcast:
+            broadcast.handle("t")
+    finally:
+        current_trace.reset(token)
+    assert seen == ["trace", "trace"]
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from async_chain import AsyncHandler, AsyncUppercaseDecorator
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, Outcome, UppercaseDecorator
+from coalesce import AsyncSingleFlight, SingleFlight
+from sinks import NullSink
+
+
+class Gate(Handler):
+    """Handler that counts walks and blocks until released."""
+
+    def __init__(self, error=None):
+        super().__init__()
+        self.walks = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.error = error
+
+    def process(self, request):
+        self.walks += 1
+        self.entered.set()
+        self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return Outcome.PASS
+
+
+class AsyncGate(AsyncHandler):
+    def __init__(self, delay=0.05, error=None):
+        super().__init__()
+        self.walks = 0
+        self.delay = delay
+        self.error = error
+
+    async def process(self, request):
+        self.walks += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return Outcome.PASS
+
+
+def run_concurrently(call, requests):
+    """Start every call, then return (futures, pool) so the caller controls release."""
+    pool = ThreadPoolExecutor(len(requests))
+    return [pool.submit(call, request) for request in requests], pool
+
+
+def wait_for_waiters(flight, calls):
+    deadline = time.monotonic() + 2
+    while flight.calls < calls and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_threads_share_one_execution_per_key():
+    """Test that concurrent identical requests walk the chain once and share the result"""
+    gate = Gate()
+    handler_a = gate.set_next(ConcreteHandlerA(sink=NullSink()))
+    handler_a.set_next(ConcreteHandlerB(sink=NullSink()))
+    flight = SingleFlight(UppercaseDecorator(gate).handle)
+
+    futures, pool = run_concurrently(flight.handle, ["same"] * 8 + ["other"])
+    wait_for_waiters(flight, 9)
+    gate.release.set()
+    results = [future.result() for future in futures]
+    pool.shutdown()
+
+    assert results == ["SAME"] * 8 + ["OTHER"]
+    assert gate.walks == 2
+    info = flight.info()
+    assert (info.calls, info.executions, info.timeouts) == (9, 2, 0)
+    assert info.ratio == pytest.approx(7 / 9)
+    # Once the flight landed, the next call runs the chain again.
+    assert flight.handle("same") == "SAME" and gate.walks == 3
+
+
+def test_thread_errors_reach_every_waiter_and_key_function():
+    """Test that the leader's exception is raised in every waiter, with a custom key"""
+    gate = Gate(error=RuntimeError("down"))
+    flight = SingleFlight(gate.handle, key=str.lower)
+
+    futures, pool = run_concurrently(flight.handle, ["Key", "KEY", "key"])
+    wait_for_waiters(flight, 3)
+    gate.release.set()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="down"):
+            future.result()
+    pool.shutdown()
+    assert gate.walks == 1
+
+
+def test_thread_timeout_gives_up_and_stale_flights_are_not_joined():
+    """Test that waiters time out, and later callers start a fresh execution"""
+    gate = Gate()
+    flight = SingleFlight(gate.handle, timeout=0.05)
+
+    leader, pool = run_concurrently(flight.handle, ["slow"])
+    gate.entered.wait()
+    with pytest.raises(TimeoutError):
+        flight.handle("slow")
+    fresh, second_pool = run_concurrently(flight.handle, ["slow"])
+    gate.release.set()
+    assert leader[0].result() == fresh[0].result() == "slow"
+    pool.shutdown()
+    second_pool.shutdown()
+    info = flight.info()
+    assert (info.executions, info.timeouts, gate.walks) == (2, 1, 2)
+
+
+def test_asyncio_tasks_share_one_execution():
+    """Test coalescing, error sharing and timeouts in asyncio mode"""
+    async def scenario():
+        gate = AsyncGate()
+        flight = AsyncSingleFlight(AsyncUppercaseDecorator(gate, sink=NullSink()).handle)
+        results = await asyncio.gather(*(flight.handle(request) for request in ["a"] * 5 + ["b"]))
+        assert results == ["A"] * 5 + ["B"]
+        assert gate.walks == 2
+        info = flight.info()
+        assert (info.calls, info.executions) == (6, 2)
+
+        failing = AsyncSingleFlight(AsyncGate(error=ValueError("bad")).handle)
+        outcomes = await asyncio.gather(*(failing.handle("x") for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+        assert failing.info().executions == 1
+
+        slow = AsyncGate(delay=0.2)
+        timed = AsyncSingleFlight(slow.handle, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.gather(timed.handle("y"), timed.handle("y"))
+        await asyncio.sleep(0.2)
+        # The shared execution kept running after its waiters gave up.
+        assert slow.walks == 1 and timed.info().timeouts >= 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+import threading
+
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, LoggingDecorator, Outcome, UppercaseDecorator
+from chain_metrics import LATENCY_BUCKETS_NS, ChainMetrics
+from sinks import NullSink
+
+
+def build_chain():
+    handler_a = ConcreteHandlerA(sink=NullSink())
+    handler_b = handler_a.set_next(ConcreteHandlerB(sink=NullSink()))
+    uppercase = UppercaseDecorator(handler_a)
+    logging_decorator = LoggingDecorator(uppercase, sink=NullSink())
+    return logging_decorator, [logging_decorator, uppercase, handler_a, handler_b]
+
+
+def test_metrics_cover_every_decorator_and_handler():
+    """Test that each hop of a decorated chain gets its own counters"""
+    head, hops = build_chain()
+    metrics = head.enable_metrics()
+
+    head.handle("one")
+    head.handle_many(["two", "three"])
+
+    stats = metrics.snapshot()
+    assert [stat.handler for stat in stats] == hops
+    assert all(stat[1:4] == (3, 0, 3) for stat in stats)
+    assert all(sum(stat.latency_histogram) == 3 for stat in stats)
+    assert all(len(stat.latency_histogram) == len(LATENCY_BUCKETS_NS) + 1 for stat in stats)
+
+
+def test_metrics_count_handled_requests():
+    """Test that a handler stopping the chain is counted as handled"""
+    class Stopper(Handler):
+        def process(self, request):
+            return Outcome.HANDLED if request == "stop" else Outcome.PASS
+
+    stopper = Stopper()
+    handler_a = stopper.set_next(ConcreteHandlerA(sink=NullSink()))
+    metrics = stopper.enable_metrics(ChainMetrics(buckets=(10**12,)))
+
+    stopper.handle("stop")
+    stopper.handle_many(["stop", "go", "stop"])
+
+    stats = metrics.snapshot()
+    assert stats[0][1:4] == (4, 3, 1)
+    assert stats[0].latency_histogram == (4, 0)
+    assert stats[1].handler is handler_a
+    assert stats[1][1:4] == (1, 0, 1)
+
+
+def test_disabled_metrics_record_nothing():
+    """Test that disabling and resetting metrics works"""
+    head, _ = build_chain()
+    metrics = head.enable_metrics()
+    head.handle("x")
+    head.disable_metrics()
+    head.handle("x")
+
+    assert head.metrics is None
+    assert metrics.snapshot()[0].seen == 1
+    metrics.reset()
+    assert metrics.snapshot() == []
+
+
+def test_metrics_shared_across_threads_lose_nothing():
+    """Test that concurrent record() calls keep exact totals and one slot per handler"""
+    metrics = ChainMetrics()
+    handlers = [ConcreteHandlerA(), ConcreteHandlerB()]
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        for n in range(2_000):
+            metrics.record(handlers[n % 2], n % 4 == 0, 500)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = metrics.snapshot()
+    assert [row.handler for row in stats] == handlers
+    assert [(row.seen, row.handled, row.passed) for row in stats] == [(8_000, 4_000, 4_000), (8_000, 0, 8_000)]
+    assert all(row.latency_histogram[0] == 8_000 for row in stats)
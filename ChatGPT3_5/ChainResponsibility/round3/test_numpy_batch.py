@@ -0,0 +1,69 @@
+import pytest
+
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, LoggingDecorator, Outcome, UppercaseDecorator
+from sinks import BufferedSink, NullSink
+
+np = pytest.importorskip("numpy")
+
+
+class Recorder(Handler):
+    """Handler without a vectorized path; records what reaches it and stops on "stop"."""
+
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    def process(self, request):
+        self.seen.append(request)
+        return Outcome.HANDLED if request == "STOP" else Outcome.PASS
+
+
+def build_chain(sink, tail=None):
+    handler_a = ConcreteHandlerA(sink=sink)
+    handler_b = handler_a.set_next(ConcreteHandlerB(sink=sink))
+    if tail is not None:
+        handler_b.set_next(tail)
+    return LoggingDecorator(UppercaseDecorator(handler_a), sink=sink)
+
+
+def test_string_array_takes_the_vectorized_path(monkeypatch):
+    """Test that a str array is uppercased in one call and never goes element by element"""
+    sink = BufferedSink()
+    head = build_chain(sink)
+    monkeypatch.setattr(UppercaseDecorator, "process", lambda self, request: pytest.fail("per-element path"))
+
+    result = head.handle_many(np.array(["one", "two"]))
+    assert isinstance(result, np.ndarray)
+    assert result.tolist() == ["ONE", "TWO"]
+    assert sink.lines() == [
+        "Logging request: one",
+        "Logging request: two",
+        "Handler A processing request: ONE",
+        "Handler A processing request: TWO",
+        "Handler B processing request: ONE",
+        "Handler B processing request: TWO",
+    ]
+
+
+def test_bytes_array_and_list_batches():
+    """Test bytes arrays, and that plain lists keep the element-wise path"""
+    head = build_chain(NullSink())
+    assert head.handle_many(np.array([b"ab", b"cd"])).tolist() == [b"AB", b"CD"]
+    assert head.handle_many(["ab", "cd"]) == ["AB", "CD"]
+
+
+def test_falls_back_per_element_from_the_first_scalar_hop():
+    """Test that hops without process_array get the rest of the batch element by element"""
+    recorder = Recorder()
+    head = build_chain(NullSink(), tail=recorder)
+    metrics = head.enable_metrics()
+
+    result = head.handle_many(np.array(["go", "stop"]))
+    assert result.tolist() == ["GO", "STOP"]
+    assert recorder.seen == ["GO", "STOP"]
+    assert [stat.seen for stat in metrics.snapshot()] == [2, 2, 2, 2, 2]
+
+    objects = np.array(["x", 1], dtype=object)
+    with pytest.raises(AttributeError):
+        head.handle_many(objects)  # 1.upper() has no vectorized or scalar meaning
+    assert head.handle_many(np.array(["y"], dtype=object)).dtype == object
@@ -0,0 +1,156 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, Outcome, UppercaseDecorator
+from pipeline import StagedPipeline, chain_stages
+
+
+class SlowHandler(Handler):
+    """Handler that sleeps and records how many calls overlap."""
+
+    def __init__(self, delay=0.01):
+        super().__init__()
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def process(self, request):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return f"{request}."
+
+
+def test_chain_stages_follow_decorators(decorated_chain):
+    """Test that every decorator and handler becomes a stage"""
+    stages = chain_stages(decorated_chain)
+    assert [type(stage).__name__ for stage in stages] == [
+        "LoggingDecorator",
+        "UppercaseDecorator",
+        "ConcreteHandlerA",
+        "ConcreteHandlerB",
+    ]
+
+
+def test_chain_stages_rejects_cycle():
+    """Test that a cyclic chain is rejected"""
+    handler_a = ConcreteHandlerA()
+    handler_a.set_next(ConcreteHandlerB()).set_next(handler_a)
+    with pytest.raises(ValueError):
+        chain_stages(handler_a)
+
+
+def test_pipeline_matches_sequential_handle(decorated_chain):
+    """Test that the pipeline returns the same results as handle(), in input order"""
+    requests = [f"request {i}" for i in range(200)]
+    pipeline = StagedPipeline(decorated_chain, workers=3, queue_size=4)
+    assert list(pipeline.map(iter(requests))) == [decorated_chain.handle(r) for r in requests]
+
+
+def test_pipeline_overlaps_slow_stage():
+    """Test that a stage's worker pool processes requests concurrently"""
+    slow = SlowHandler()
+    slow.set_next(UppercaseDecorator(ConcreteHandlerA()))
+    pipeline = StagedPipeline(slow, workers=[4, 1, 1], queue_size=2)
+
+    assert list(pipeline.map(["a", "b", "c", "d", "e", "f", "g", "h"])) == [
+        "A.", "B.", "C.", "D.", "E.", "F.", "G.", "H."
+    ]
+    assert slow.max_in_flight > 1
+
+
+def test_pipeline_stops_on_handled():
+    """Test that a HANDLED outcome skips the remaining stages"""
+    class Stopper(Handler):
+        def process(self, request):
+            return Outcome.HANDLED if request == "stop" else Outcome.PASS
+
+    stopper = Stopper()
+    stopper.set_next(UppercaseDecorator(ConcreteHandlerA()))
+    assert list(StagedPipeline(stopper).map(["stop", "go"])) == ["stop", "GO"]
+
+
+def test_pipeline_propagates_errors():
+    """Test that an exception in a stage reaches the caller"""
+    class Broken(Handler):
+        def process(self, request):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        list(StagedPipeline(Broken()).map(["x"]))
+
+
+def test_pipeline_rejects_bad_configuration(decorated_chain):
+    """Test that invalid settings are rejected"""
+    with pytest.raises(ValueError):
+        StagedPipeline(decorated_chain, executor="fiber")
+    with pytest.raises(ValueError):
+        StagedPipeline(decorated_chain, workers=[1, 1])
+    with pytest.raises(ValueError):
+        StagedPipeline(decorated_chain, queue_size=0)
+
+
+def test_process_pipeline(decorated_chain):
+    """Test that stages can run in process pools"""
+    pipeline = StagedPipeline(decorated_chain, workers=2, executor="process")
+    assert list(pipeline.map(["x", "y", "z"])) == ["X", "Y", "Z"]
+
+
+def test_process_pipeline_returns_buffers_changed_in_place(decorated_chain):
+    """Test that a bytearray uppercased in a worker process comes back uppercased"""
+    pipeline = StagedPipeline(decorated_chain, executor="process")
+    expected = decorated_chain.handle(bytearray(b"abc"))
+    assert list(pipeline.map([bytearray(b"abc"), bytearray(b"de")])) == [expected, b"DE"]
+    assert expected == b"ABC"
+
+
+def test_pipeline_bounds_requests_held_for_reordering():
+    """Test that one stuck request stops the feed instead of letting results pile up behind it"""
+    release = threading.Event()
+
+    class Gate(Handler):
+        def process(self, request):
+            if request == 0:
+                release.wait(5)
+            return Outcome.PASS
+
+    pulled = []
+
+    def requests():
+        for n in range(1000):
+            pulled.append(n)
+            yield n
+
+    results = StagedPipeline(Gate(), workers=2, queue_size=2).map(requests())
+    first = []
+    consumer = threading.Thread(target=lambda: first.append(next(results)))
+    consumer.start()
+    time.sleep(0.3)
+    assert len(pulled) <= 2 * 2 + 1
+    release.set()
+    consumer.join()
+    assert first == [0]
+    assert list(results) == list(range(1, 1000))
+
+
+@pytest.mark.parametrize("round_name", ["round1", "round2"])
+def test_pipeline_runs_chains_with_their_own_outcome_enum(round_name, capsys):
+    """Test that a round1/round2 chain, with its own Outcome enum, runs like its handle()"""
+    path = Path(__file__).resolve().parent.parent / round_name / "code.py"
+    spec = importlib.util.spec_from_file_location(f"chatgpt_{round_name}_code", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    handler_a = module.ConcreteHandlerA()
+    handler_a.set_next(module.ConcreteHandlerB())
+    head = module.LoggingDecorator(module.UppercaseDecorator(handler_a))
+
+    assert list(StagedPipeline(head).map(["x", "y"])) == ["X", "Y"] == [head.handle("x"), head.handle("y")]
+    assert "Handler B processing request: Y" in capsys.readouterr().out
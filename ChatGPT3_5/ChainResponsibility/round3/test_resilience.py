@@ -0,0 +1,137 @@
+import threading
+
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, Outcome, UppercaseDecorator
+from chain_metrics import ChainMetrics
+from resilience import BreakerState, CircuitBreakerDecorator
+from sinks import BufferedSink
+
+
+class Flaky(Handler):
+    """Handler that fails while `failing` is set, and tags requests otherwise."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+        self.calls = 0
+
+    def process(self, request):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("down")
+        return request + "+flaky"
+
+
+class Slow(Handler):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.started = []
+
+    def process(self, request):
+        self.started.append(request)
+        self.release.wait()
+        return request + "+slow"
+
+
+def build_chain(hop, sink, **options):
+    """A -> breaker(hop) -> B; returns the head and the breaker."""
+    handler_a = ConcreteHandlerA(sink=sink)
+    breaker = CircuitBreakerDecorator(hop, **options)
+    handler_a.set_next(breaker)
+    hop.set_next(ConcreteHandlerB(sink=sink))
+    return handler_a, breaker
+
+
+def test_breaker_trips_skips_and_recovers(clock):
+    """Test closed -> open -> half-open -> open -> half-open -> closed"""
+    metrics = ChainMetrics()
+    flaky = Flaky()
+    sink = BufferedSink()
+    head, breaker = build_chain(flaky, sink, failure_threshold=2, reset_timeout=10, metrics=metrics, clock=clock)
+
+    # Failures pass the request on; the rest of the chain still runs.
+    assert head.handle("a") == "a"
+    assert breaker.state is BreakerState.CLOSED
+    head.handle("b")
+    assert breaker.state is BreakerState.OPEN
+    head.handle("c")
+    assert flaky.calls == 2
+    assert "Handler B processing request: c" in sink.lines()
+
+    clock.now = 10
+    head.handle("probe fails")
+    assert breaker.state is BreakerState.OPEN and flaky.calls == 3
+
+    clock.now = 20
+    flaky.failing = False
+    assert head.handle("d") == "d+flaky"
+    assert breaker.state is BreakerState.CLOSED
+
+    events = {event: count for (handler, event), count in metrics.events().items() if handler is breaker}
+    assert events == {
+        "failure": 3,
+        "closed->open": 1,
+        "skipped": 1,
+        "open->half_open": 2,
+        "half_open->open": 1,
+        "half_open->closed": 1,
+    }
+
+
+def test_timeout_keeps_the_chain_moving():
+    """Test that a slow hop is abandoned after its budget and counted as a timeout"""
+    metrics = ChainMetrics()
+    slow = Slow()
+    sink = BufferedSink()
+    head, breaker = build_chain(slow, sink, timeout=0.05, failure_threshold=1, metrics=metrics)
+
+    assert UppercaseDecorator(head).handle("x") == "X"
+    assert sink.lines() == ["Handler A processing request: X", "Handler B processing request: X"]
+    assert breaker.state is BreakerState.OPEN
+    assert metrics.events()[(breaker, "timeout")] == 1
+    slow.release.set()
+
+
+def test_busy_workers_fail_fast_and_abandoned_calls_never_start():
+    """Test that calls don't queue behind a stuck one and run after their fallback was returned"""
+    metrics = ChainMetrics()
+    slow = Slow()
+    head, breaker = build_chain(slow, BufferedSink(), timeout=0.05, failure_threshold=10, max_workers=1,
+                                metrics=metrics)
+
+    assert [head.handle(f"r{n}") for n in range(4)] == ["r0", "r1", "r2", "r3"]
+    slow.release.set()
+    breaker._executor.shutdown()
+    assert slow.started == ["r0"]
+    events = metrics.events()
+    assert (events[(breaker, "timeout")], events[(breaker, "saturated")]) == (1, 3)
+
+
+def test_timed_call_sees_the_callers_output_capture():
+    """Test that get_output() captures a hop run on the breaker's worker thread"""
+    head = CircuitBreakerDecorator(ConcreteHandlerB(sink=BufferedSink()), timeout=1)
+    assert head.get_output("x") == "Handler B processing request: x"
+
+
+def test_breaker_passes_outcomes_through():
+    """Test that a healthy hop's outcomes, including HANDLED, reach the chain"""
+    class Stop(Handler):
+        def process(self, request):
+            return Outcome.HANDLED
+
+    sink = BufferedSink()
+    head, breaker = build_chain(Stop(), sink, timeout=1)
+    assert head.handle("x") == "x"
+    assert sink.lines() == ["Handler A processing request: x"]
+    assert breaker.successor() is not None and breaker.state is BreakerState.CLOSED
+
+
+def test_metrics_events_reset():
+    """Test that reset() forgets recorded events"""
+    metrics = ChainMetrics()
+    handler = ConcreteHandlerB()
+    metrics.record_event(handler, "tick")
+    metrics.record_event(handler, "tick", 2)
+    assert metrics.events() == {(handler, "tick"): 3}
+    metrics.reset()
+    assert metrics.events() == {}
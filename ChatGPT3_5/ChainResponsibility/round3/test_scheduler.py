@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from code import Handler, Outcome
+from scheduler import DeadlineExceeded, Priority, RequestScheduler, SchedulerClosed
+
+
+class Recorder(Handler):
+    """Handler that records the order requests reach it."""
+
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    def process(self, request):
+        self.seen.append(request)
+        return Outcome.HANDLED
+
+
+def test_priority_then_deadline_then_arrival(clock):
+    """Test that the queue runs by priority class, then earliest deadline, then FIFO"""
+    recorder = Recorder()
+    scheduler = RequestScheduler(recorder.handle, workers=0, clock=clock)
+    scheduler.submit("bulk-1", Priority.BULK)
+    scheduler.submit("normal-late", deadline=50)
+    scheduler.submit("bulk-2", Priority.BULK)
+    scheduler.submit("normal-soon", deadline=10)
+    scheduler.submit("normal-none")
+    scheduler.submit("interactive", Priority.INTERACTIVE)
+
+    assert len(scheduler) == 6
+    assert scheduler.run_pending() == 6
+    assert recorder.seen == ["interactive", "normal-soon", "normal-late", "normal-none", "bulk-1", "bulk-2"]
+
+
+def test_expired_requests_are_dropped_before_any_handler(decorated_chain, clock):
+    """Test that a request past its deadline never reaches the chain"""
+    recorder = Recorder()
+    scheduler = RequestScheduler(recorder.handle, workers=0, clock=clock)
+    expired = scheduler.submit("late", timeout=1)
+    fresh = scheduler.submit("fresh", deadline=5)
+    clock.now = 2
+
+    scheduler.run_pending()
+    with pytest.raises(DeadlineExceeded):
+        expired.result()
+    assert fresh.result() == "fresh"
+    assert recorder.seen == ["fresh"]
+    assert (scheduler.completed, scheduler.dropped) == (1, 1)
+
+    scheduler = RequestScheduler(decorated_chain.handle, workers=0)
+    result = scheduler.submit("request 1", timeout=60)
+    scheduler.run_pending()
+    assert result.result() == "REQUEST 1"
+
+
+def test_interactive_traffic_overtakes_queued_bulk():
+    """Test that with workers busy, later interactive requests run before queued bulk ones"""
+    gate = threading.Event()
+    recorder = Recorder()
+
+    def handle(request):
+        gate.wait()
+        return recorder.handle(request)
+
+    with RequestScheduler(handle, workers=1) as scheduler:
+        blocker = scheduler.submit("blocker", Priority.BULK)
+        while len(scheduler):
+            pass
+        bulk = [scheduler.submit(f"bulk-{n}", Priority.BULK) for n in range(3)]
+        interactive = scheduler.submit("interactive", Priority.INTERACTIVE)
+        gate.set()
+    assert recorder.seen == ["blocker", "interactive", "bulk-0", "bulk-1", "bulk-2"]
+    assert all(future.done() for future in [blocker, interactive, *bulk])
+
+
+def test_errors_and_close():
+    """Test that handler errors reach the future and closing rejects or cancels requests"""
+    def fail(request):
+        raise RuntimeError(request)
+
+    scheduler = RequestScheduler(fail, workers=0)
+    future = scheduler.submit("boom")
+    scheduler.run_pending()
+    with pytest.raises(RuntimeError, match="boom"):
+        future.result()
+
+    pending = scheduler.submit("never")
+    cancelled = scheduler.submit("cancelled")
+    assert cancelled.cancel()
+    scheduler.close(cancel_pending=True)
+    with pytest.raises(SchedulerClosed):
+        pending.result()
+    assert cancelled.cancelled()
+    with pytest.raises(SchedulerClosed):
+        scheduler.submit("after close")
+    with pytest.raises(ValueError):
+        RequestScheduler(fail, workers=0).submit("x", deadline=1, timeout=1)
@@ -0,0 +1,93 @@
+import io
+import logging
+import threading
+
+import pytest
+
+from code import ConcreteHandlerA
+from sinks import INFO, BufferedSink, LoggerSink, NullSink, QueueSink
+
+
+class Payload:
+    """Request whose formatting is observable."""
+
+    def __init__(self, text):
+        self.text = text
+        self.formatted_on = []
+
+    def upper(self):
+        return self
+
+    def __str__(self):
+        self.formatted_on.append(threading.current_thread().name)
+        return self.text
+
+
+def test_buffered_sink_collects_chain_output(decorated_chain):
+    """Test that set_sink() reaches every hop and the buffer keeps their output"""
+    sink = BufferedSink()
+    decorated_chain.set_sink(sink)
+    decorated_chain.handle("test request")
+
+    assert sink.lines() == [
+        "Logging request: test request",
+        "Handler A processing request: TEST REQUEST",
+        "Handler B processing request: TEST REQUEST",
+    ]
+    sink.clear()
+    decorated_chain.handle_many(["x"])
+    assert sink.getvalue() == "Logging request: x\nHandler A processing request: X\nHandler B processing request: X"
+
+
+def test_buffered_sink_is_bounded():
+    """Test that a bounded buffer keeps only the newest records"""
+    sink = BufferedSink(maxlen=2)
+    handler = ConcreteHandlerA(sink=sink)
+    for request in ["a", "b", "c"]:
+        handler.handle(request)
+    assert sink.lines() == ["Handler A processing request: b", "Handler A processing request: c"]
+
+
+@pytest.mark.parametrize("sink", [NullSink(), BufferedSink(level=logging.WARNING)])
+def test_disabled_level_never_formats(decorated_chain, sink):
+    """Test that disabled sinks skip formatting entirely"""
+    decorated_chain.set_sink(sink)
+    payload = Payload("quiet")
+    decorated_chain.handle(payload)
+    decorated_chain.handle_many([payload])
+    assert payload.formatted_on == []
+
+
+def test_queue_sink_formats_in_background(decorated_chain):
+    """Test that the queue sink formats on its own thread"""
+    stream = io.StringIO()
+    sink = QueueSink(stream)
+    decorated_chain.set_sink(sink)
+    payload = Payload("loud")
+
+    decorated_chain.handle(payload)
+    sink.flush()
+    sink.close()
+
+    assert stream.getvalue().splitlines() == [
+        "Logging request: loud",
+        "Handler A processing request: loud",
+        "Handler B processing request: loud",
+    ]
+    assert payload.formatted_on
+    assert threading.current_thread().name not in payload.formatted_on
+
+
+def test_logger_sink_follows_logger_level(caplog):
+    """Test that the logger sink defers to the logger's level"""
+    logger = logging.getLogger("chain-test")
+    sink = LoggerSink(logger)
+    handler = ConcreteHandlerA(sink=sink)
+
+    with caplog.at_level(logging.WARNING, logger="chain-test"):
+        assert not sink.enabled(INFO)
+        handler.handle("hidden")
+    with caplog.at_level(logging.INFO, logger="chain-test"):
+        handler.handle("shown")
+
+    assert [record.getMessage() for record in caplog.records] == ["Handler A processing request: shown"]
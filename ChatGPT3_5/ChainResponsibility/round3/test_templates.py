@@ -0,0 +1,115 @@
+import sys
+
+import pytest
+
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, LoggingDecorator, Outcome, UppercaseDecorator
+from sinks import BufferedSink
+from templates import ChainTemplate
+
+
+class Tag(Handler):
+    """Handler that appends a marker to string requests."""
+
+    def __init__(self, marker):
+        super().__init__()
+        self.marker = marker
+
+    def process(self, request):
+        return request + self.marker
+
+
+class Stop(Handler):
+    def process(self, request):
+        return Outcome.HANDLED
+
+
+@pytest.fixture
+def template():
+    handler_a = ConcreteHandlerA()
+    handler_a.set_next(ConcreteHandlerB())
+    return ChainTemplate.from_chain(LoggingDecorator(UppercaseDecorator(handler_a)))
+
+
+def test_from_chain_names_hops(template):
+    """Test that a template keeps the chain order and names hops after their class"""
+    assert template.names == ("LoggingDecorator", "UppercaseDecorator", "ConcreteHandlerA", "ConcreteHandlerB")
+    assert template.handle("x") == "X"
+    assert template.tenant().names == template.names
+
+    repeated = Tag("1")
+    repeated.set_next(Tag("2"))
+    assert ChainTemplate.from_chain(repeated).names == ("Tag", "Tag#2")
+    with pytest.raises(ValueError):
+        ChainTemplate([("a", Tag("1")), ("a", Tag("2"))])
+
+
+def test_tenant_changes_are_copy_on_write(template):
+    """Test that edits return new tenant chains and leave the template and other tenants alone"""
+    base = template.tenant()
+    tagged = base.add("tag", Tag("!"), after="UppercaseDecorator")
+    quiet = tagged.remove("LoggingDecorator")
+    lower = base.replace("UppercaseDecorator", Tag("?"))
+
+    assert tagged.names == ("LoggingDecorator", "UppercaseDecorator", "tag", "ConcreteHandlerA", "ConcreteHandlerB")
+    assert quiet.names == ("UppercaseDecorator", "tag", "ConcreteHandlerA", "ConcreteHandlerB")
+    assert tagged.handle("x") == "X!"
+    assert lower.handle("x") == "x?"
+    assert base.handle("x") == template.handle("x") == "X"
+    assert (base.changes, tagged.changes, quiet.changes, lower.changes) == (0, 1, 2, 1)
+    # The unchanged hops are the template's own objects.
+    assert dict(quiet.hops())["ConcreteHandlerA"] is template["ConcreteHandlerA"]
+
+
+def test_tenant_chain_order_and_outcomes(template):
+    """Test insertion at the front, after removed hops, and an early HANDLED"""
+    tenant = (
+        template.tenant()
+        .add("first", Tag("<"))
+        .add("a1", Tag("1"), after="ConcreteHandlerA")
+        .add("a2", Tag("2"), after="a1")
+        .remove("ConcreteHandlerA")
+        .remove("a1")
+    )
+    assert tenant.names == ("first", "LoggingDecorator", "UppercaseDecorator", "a2", "ConcreteHandlerB")
+    assert tenant.handle("x") == "X<2"
+
+    stopped = tenant.replace("UppercaseDecorator", Stop())
+    assert stopped.handle("x") == "x<"
+    with pytest.raises(KeyError):
+        tenant.remove("ConcreteHandlerA")
+    with pytest.raises(ValueError):
+        tenant.add("a1", Tag("again"))
+
+
+def test_tenant_output_goes_to_shared_sinks(template):
+    """Test that a tenant's hops emit through the sinks of the shared handlers"""
+    sink = BufferedSink()
+    template["LoggingDecorator"].set_sink(sink)
+    template.tenant().remove("ConcreteHandlerA").handle("x")
+    assert sink.lines() == ["Logging request: x", "Handler B processing request: X"]
+
+
+def test_memory_grows_with_changes_not_tenants():
+    """Test that a tenant with one change costs far less than a rebuilt chain"""
+    template = ChainTemplate((f"hop{i}", Tag(str(i))) for i in range(200))
+    tenant = template.tenant().replace("hop100", Tag("x"))
+
+    overlay = sys.getsizeof(tenant) + sys.getsizeof(tenant._replaced) + sys.getsizeof(tenant._added)
+    assert overlay < sys.getsizeof(template._handlers) / 2
+    assert len(tenant.names) == 200
+
+
+def test_tenant_plan_matches_hops_and_stays_small():
+    """Test that handle() runs exactly the hops() order from a plan sized by the changes"""
+    template = ChainTemplate((f"hop{i}", Tag(str(i))) for i in range(50))
+    tenants = [
+        template.tenant(),
+        template.tenant().add("front", Tag("<")),
+        template.tenant().remove("hop0").remove("hop49"),
+        template.tenant().replace("hop10", Tag("x")).add("after", Tag("!"), after="hop10").remove("hop30"),
+        template.tenant().add("a", Tag("a"), after="hop5").remove("hop5").add("b", Tag("b"), after="a"),
+    ]
+    for tenant in tenants:
+        expected = "".join(handler.marker for _, handler in tenant.hops())
+        assert tenant.handle("") == expected
+        assert len(tenant._plan) <= 2 * tenant.changes + 1
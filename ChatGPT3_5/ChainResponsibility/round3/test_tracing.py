@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from async_chain import AsyncLoggingDecorator, AsyncUppercaseDecorator, ThreadedHandler, handle_concurrently
+from code import ConcreteHandlerA, ConcreteHandlerB, Handler, LoggingDecorator, UppercaseDecorator
+from sinks import NullSink
+from tracing import Tracer, current_trace
+
+
+def build_chain():
+    handler_a = ConcreteHandlerA(sink=NullSink())
+    handler_a.set_next(ConcreteHandlerB(sink=NullSink()))
+    return LoggingDecorator(UppercaseDecorator(handler_a), sink=NullSink())
+
+
+def test_trace_records_path_timing_and_transformations():
+    """Test that a sampled request records every hop, its time and the uppercase step"""
+    head = build_chain()
+    tracer = head.enable_tracing(Tracer(sample_rate=1.0))
+
+    assert head.handle("test request") == "TEST REQUEST"
+    (trace,) = tracer.traces
+    assert trace.path == ("LoggingDecorator", "UppercaseDecorator", "ConcreteHandlerA", "ConcreteHandlerB")
+    assert all(span.elapsed_ns >= 0 for span in trace.spans)
+    assert trace.total_ns == sum(span.elapsed_ns for span in trace.spans)
+    assert [(type(handler).__name__, before, after) for handler, before, after in trace.transformations] == [
+        ("UppercaseDecorator", "test request", "TEST REQUEST")
+    ]
+    assert (trace.request, trace.result) == ("test request", "TEST REQUEST")
+    assert current_trace.get() is None
+
+
+def test_sampling_rate_and_disable():
+    """Test that only sampled requests are traced, and that nothing leaks when off"""
+    finished = []
+    head = build_chain()
+    draws = itertools.cycle([0.1, 0.9])
+    head.enable_tracing(Tracer(sample_rate=0.5, maxlen=2, on_finish=finished.append, rng=lambda: next(draws)))
+
+    for n in range(6):
+        head.handle(f"r{n}")
+    assert [trace.request for trace in finished] == ["r0", "r2", "r4"]
+    assert head._tracer.traces.maxlen == 2 and len(head._tracer.traces) == 2
+
+    head.disable_tracing()
+    head.handle("untraced")
+    assert len(finished) == 3
+    with pytest.raises(ValueError):
+        Tracer(sample_rate=2)
+
+
+def test_failing_hop_does_not_leak_trace_context():
+    """Test that the trace context is reset when a hop raises"""
+    class Broken(Handler):
+        def process(self, request):
+            raise RuntimeError("broken")
+
+    head = Broken()
+    head.enable_tracing(Tracer(sample_rate=1.0))
+    with pytest.raises(RuntimeError):
+        head.handle("x")
+    assert current_trace.get() is None
+
+
+def test_threads_get_separate_traces():
+    """Test that concurrent threads each record into their own trace"""
+    head = build_chain()
+    tracer = head.enable_tracing(Tracer(sample_rate=1.0))
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(head.handle, [f"r{n}" for n in range(40)]))
+
+    assert results == [f"R{n}" for n in range(40)]
+    assert len(tracer.traces) == 40
+    assert all(len(trace.spans) == 4 for trace in tracer.traces)
+    assert {trace.result for trace in tracer.traces} == set(results)
+
+
+def test_trace_follows_asyncio_tasks_and_worker_threads():
+    """Test that a trace started in async code also collects the sync chain run in a worker thread"""
+    head = AsyncLoggingDecorator(AsyncUppercaseDecorator(ThreadedHandler(build_chain())), sink=NullSink())
+    tracer = head.enable_tracing(Tracer(sample_rate=1.0))
+
+    results = asyncio.run(handle_concurrently(head, [f"r{n}" for n in range(10)], limit=5))
+
+    assert results == [f"R{n}" for n in range(10)]
+    assert len(tracer.traces) == 10
+    for trace in tracer.traces:
+        assert trace.path == (
+            "AsyncLoggingDecorator",
+            "AsyncUppercaseDecorator",
+            "LoggingDecorator",
+            "UppercaseDecorator",
+            "ConcreteHandlerA",
+            "ConcreteHandlerB",
+            "ThreadedHandler",
+        )
+        assert trace.result == trace.request.upper()
@@ -0,0 +1,84 @@
+import itertools
+import random
+from collections import deque, namedtuple
+from contextvars import ContextVar
+
+# One hop of a traced request: the handler, the time spent in its process(), the
+# request as it arrived and as it was passed on, and whether the hop handled it.
+Span = namedtuple("Span", ["handler", "elapsed_ns", "request_in", "request_out", "handled"])
+
+# The trace of the request being handled in the current context. Chains started
+# while it is set (nested chains, ThreadedHandler's worker thread, asyncio tasks)
+# record their hops into it.
+current_trace = ContextVar("current_trace", default=None)
+
+_trace_ids = itertools.count(1)
+
+
+class Trace:
+    """The ordered hops one sampled request went through.
+
+    A span is recorded when its hop finishes, so the hops of a nested chain come
+    before the hop that ran it.
+    """
+
+    __slots__ = ("trace_id", "request", "spans", "result")
+
+    def __init__(self, request):
+        self.trace_id = next(_trace_ids)
+        self.request = request
+        self.spans = []
+        self.result = None
+
+    def record(self, handler, elapsed_ns, request_in, request_out, handled):
+        self.spans.append(Span(handler, elapsed_ns, request_in, request_out, handled))
+
+    @property
+    def path(self):
+        """Class names of the handlers visited, in order."""
+        return tuple(type(span.handler).__name__ for span in self.spans)
+
+    @property
+    def total_ns(self):
+        """Time spent in handlers, summed over every hop."""
+        return sum(span.elapsed_ns for span in self.spans)
+
+    @property
+    def transformations(self):
+        """(handler, before, after) for every hop that passed on a different request."""
+        return [
+            (span.handler, span.request_in, span.request_out)
+            for span in self.spans
+            if span.request_out is not span.request_in
+        ]
+
+    def __repr__(self):
+        return f"Trace({self.trace_id}, {' -> '.join(self.path)}, {self.total_ns} ns)"
+
+
+class Tracer:
+    """Decide which requests to trace and keep the most recent finished traces.
+
+    sample_rate is the fraction of requests traced, from 0.0 (off) to 1.0 (all).
+    Finished traces go to traces (a deque of at most maxlen) and to on_finish, if given.
+    """
+
+    def __init__(self, sample_rate=0.01, maxlen=1000, on_finish=None, rng=random.random):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0.0 and 1.0")
+        self.sample_rate = sample_rate
+        self.traces = deque(maxlen=maxlen)
+        self._on_finish = on_finish
+        self._rng = rng
+
+    def start(self, request):
+        """Return a new Trace if this request is sampled, otherwise None."""
+        if self.sample_rate and self._rng() < self.sample_rate:
+            return Trace(request)
+        return None
+
+    def finish(self, trace, result):
+        trace.result = result
+        self.traces.append(trace)
+        if self._on_finish is not None:
+            self._on_finish(trace)
@@ -1,7 +1,12 @@
 import pytest
+import itertools
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tracemalloc
 from io import StringIO
-from code import ConcreteHandlerA, ConcreteHandlerB, LoggingDecorator, UppercaseDecorator
+from code import UPPERCASE_CHUNK, Handler, Outcome, ConcreteHandlerA, ConcreteHandlerB, HandlerDecorator, LoggingDecorator, UppercaseDecorator, main
+from sinks import BufferedSink, NullSink
 
 # Set up logging configuration for tests
 logging.basicConfig(level=logging.DEBUG, format='%(message)s')
@@ -52,6 +57,249 @@ def test_chain_with_decorators(setup_handlers):
     """Test Chain of Responsibility with Decorators"""
     decorated_handler, _, _ = setup_handlers
     output = decorated_handler.get_output("test request")
-    assert "Logging request: TEST REQUEST" in output
+    # LoggingDecorator wraps UppercaseDecorator, so it logs the request before it is uppercased.
+    assert "Logging request: test request" in output
     assert "Handler A processing request: TEST REQUEST" in output
     assert "Handler B processing request: TEST REQUEST" in output
+
+
+def test_handle_many_matches_single_requests(setup_handlers, caplog):
+    """Test that a batch produces the same log lines as single requests"""
+    decorated_handler, _, _ = setup_handlers
+    with caplog.at_level(logging.INFO):
+        for request in ["request 1", "request 2"]:
+            decorated_handler.handle(request)
+        one_by_one = sorted(record.getMessage() for record in caplog.records)
+        caplog.clear()
+        results = decorated_handler.handle_many(iter(["request 1", "request 2"]))
+        batched = sorted(record.getMessage() for record in caplog.records)
+
+    assert batched == one_by_one
+    assert results == ["REQUEST 1", "REQUEST 2"]
+
+
+def test_handle_many_default_calls_handle():
+    """Test that handlers without a batch override fall back to process()"""
+    class RecordingHandler(Handler):
+        def __init__(self):
+            super().__init__()
+            self.seen = []
+
+        def process(self, request):
+            self.seen.append(request)
+
+    handler_a = ConcreteHandlerA()
+    recorder = handler_a.set_next(RecordingHandler())
+    assert handler_a.handle_many(["x", "y"]) == ["x", "y"]
+    assert recorder.seen == ["x", "y"]
+
+
+def test_deep_chain_does_not_recurse(caplog):
+    """Test that chains longer than the recursion limit are walked in a loop"""
+    head = ConcreteHandlerA()
+    handler = head
+    for _ in range(5000):
+        handler = handler.set_next(ConcreteHandlerB())
+    decorated = UppercaseDecorator(head)
+    with caplog.at_level(logging.WARNING):
+        assert decorated.handle("deep") == "DEEP"
+        assert decorated.handle_many(["a", "b"]) == ["A", "B"]
+
+
+def test_handled_outcome_stops_the_chain():
+    """Test that a handler returning HANDLED stops the walk"""
+    class Stopper(Handler):
+        def process(self, request):
+            return Outcome.HANDLED
+
+    stopper = Stopper()
+    stopper.set_next(UppercaseDecorator(ConcreteHandlerB()))
+
+    assert stopper.handle("x") == "x"
+    assert stopper.handle_many(["x", "y"]) == ["x", "y"]
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_stream_is_lazy(setup_handlers, batch_size, caplog):
+    """Test that stream() pulls requests only as results are consumed"""
+    decorated_handler, _, _ = setup_handlers
+    pulled = []
+
+    def requests():
+        for i in itertools.count():
+            pulled.append(i)
+            yield f"request {i}"
+
+    with caplog.at_level(logging.WARNING):
+        results = decorated_handler.stream(requests(), batch_size=batch_size)
+        assert pulled == []
+        assert list(itertools.islice(results, 4)) == [f"REQUEST {i}" for i in range(4)]
+    assert len(pulled) <= 4 + batch_size
+
+
+def test_stream_rejects_bad_batch_size(setup_handlers):
+    """Test that a batch size below one is rejected"""
+    decorated_handler, _, _ = setup_handlers
+    with pytest.raises(ValueError):
+        list(decorated_handler.stream(["x"], batch_size=0))
+
+
+def test_fuse_matches_handle(setup_handlers, caplog):
+    """Test that a fused chain applies the same transformations in the same order"""
+    decorated_handler, handler_a, _ = setup_handlers
+    fused = LoggingDecorator(HandlerDecorator(decorated_handler)).fuse()
+    with caplog.at_level(logging.INFO):
+        assert fused("test request") == "TEST REQUEST"
+    assert [record.getMessage() for record in caplog.records] == [
+        "Logging request: test request",
+        "Logging request: test request",
+        "Handler A processing request: TEST REQUEST",
+        "Handler B processing request: TEST REQUEST",
+    ]
+
+
+def test_fuse_stops_on_handled_and_rejects_cycles():
+    """Test that a fused chain stops at HANDLED and that cycles are rejected"""
+    class Stopper(Handler):
+        def process(self, request):
+            return Outcome.HANDLED
+
+    stopper = Stopper()
+    stopper.set_next(UppercaseDecorator(ConcreteHandlerA()))
+    assert stopper.fuse()("x") == "x"
+
+    handler_a = ConcreteHandlerA()
+    handler_a.set_next(ConcreteHandlerB()).set_next(handler_a)
+    with pytest.raises(ValueError):
+        handler_a.fuse()
+
+
+def test_get_output_is_per_thread():
+    """Test that concurrent get_output calls only see their own request's output"""
+    handler_a = ConcreteHandlerA(sink=NullSink())
+    handler_a.set_next(ConcreteHandlerB(sink=NullSink()))
+    barrier = threading.Barrier(8)
+
+    def run(i):
+        barrier.wait()
+        return [handler_a.get_output(f"request {i}-{n}") for n in range(50)]
+
+    with ThreadPoolExecutor(8) as pool:
+        outputs = list(pool.map(run, range(8)))
+
+    for i, results in enumerate(outputs):
+        for n, output in enumerate(results):
+            assert output == (
+                f"Handler A processing request: request {i}-{n}\n"
+                f"Handler B processing request: request {i}-{n}"
+            )
+
+
+def test_get_output_is_bounded_and_nestable():
+    """Test that capture keeps the newest lines and nested captures don't mix"""
+    class Nested(Handler):
+        def process(self, request):
+            inner = ConcreteHandlerB(sink=NullSink()).get_output("inner")
+            self._sink.emit(logging.INFO, "nested saw: %s", inner)
+
+    head = ConcreteHandlerA(sink=NullSink())
+    head.set_next(Nested(sink=NullSink()))
+    assert head.get_output("outer") == (
+        "Handler A processing request: outer\n"
+        "nested saw: Handler B processing request: inner"
+    )
+
+    head = ConcreteHandlerA(sink=NullSink())
+    handler = head
+    for _ in range(1500):
+        handler = handler.set_next(ConcreteHandlerB(sink=NullSink()))
+    assert len(head.get_output("x").splitlines()) == 1000
+
+
+def test_handlers_have_fixed_layout(setup_handlers):
+    """Test that handler and decorator instances carry no __dict__"""
+    decorated_handler, handler_a, handler_b = setup_handlers
+    for handler in (decorated_handler, decorated_handler._handler, handler_a, handler_b):
+        assert not hasattr(handler, "__dict__")
+    with pytest.raises(AttributeError):
+        handler_a._output = []
+
+
+def test_unslotted_subclass_still_works():
+    """Test that subclasses without __slots__ can keep adding attributes"""
+    class Tagged(ConcreteHandlerA):
+        def __init__(self):
+            super().__init__(sink=NullSink())
+            self.tag = "extra"
+
+    handler = Tagged()
+    handler.set_next(ConcreteHandlerB(sink=NullSink()))
+    assert handler.tag == "extra"
+    assert UppercaseDecorator(handler).handle("x") == "X"
+
+
+def build_quiet_chain(sink):
+    handler_a = ConcreteHandlerA(sink=sink)
+    handler_a.set_next(ConcreteHandlerB(sink=sink))
+    return LoggingDecorator(UppercaseDecorator(handler_a), sink=sink)
+
+
+def traced_peak(call):
+    """Run call() and return its result and the peak memory traced while it ran."""
+    tracemalloc.start()
+    try:
+        result = call()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("wrap", [bytearray, lambda data: memoryview(bytearray(data))])
+def test_mutable_buffers_are_uppercased_in_place(wrap):
+    """Test that a large mutable buffer travels the whole chain without being copied"""
+    payload = wrap(b"payload " * (1 << 19))  # 4 MiB
+    head = build_quiet_chain(NullSink())
+
+    result, peak = traced_peak(lambda: head.handle(payload))
+    assert result is payload
+    assert bytes(payload[:16]) == b"PAYLOAD PAYLOAD "
+    # Only chunk-sized temporaries, never a copy of the payload.
+    assert peak < 4 * UPPERCASE_CHUNK
+
+    batch = [wrap(b"x" * 10), wrap(b"y" * 10)]
+    results = head.handle_many(batch)
+    assert all(result is original for result, original in zip(results, batch))
+    assert bytes(results[1]) == b"Y" * 10
+
+
+def test_buffer_logging_never_formats_contents():
+    """Test that enabled sinks log a buffer's type and size, not its bytes"""
+    sink = BufferedSink()
+    payload = bytearray(b"a" * (1 << 20))
+    head = build_quiet_chain(sink)
+
+    _, peak = traced_peak(lambda: (head.handle(payload), sink.lines()))
+    assert sink.lines() == [
+        "Logging request: <bytearray of 1048576 bytes>",
+        "Handler A processing request: <bytearray of 1048576 bytes>",
+        "Handler B processing request: <bytearray of 1048576 bytes>",
+    ]
+    assert peak < 4 * UPPERCASE_CHUNK
+
+
+def test_immutable_buffers_get_one_copy():
+    """Test that bytes and read-only views come out as an uppercased copy"""
+    head = build_quiet_chain(NullSink())
+    assert head.handle(b"abc") == b"ABC"
+    view = memoryview(b"abc")
+    assert head.handle(view) == b"ABC"
+    assert head.handle("still works") == "STILL WORKS"
+
+
+def test_main_logs_each_line_once(caplog):
+    """Test that the demo logs what get_output() captured without the chain also logging it"""
+    with caplog.at_level(logging.INFO):
+        main()
+    lines = "\n".join(record.getMessage() for record in caplog.records).splitlines()
+    assert lines.count("Handler A processing request: REQUEST 1") == 1
+    assert len(lines) == 6
@@ -0,0 +1,47 @@
+"""Decision caching shared by the Gemini chain rounds.
+
+round_1 and round_3 import their decision cache from here; every round takes its
+metrics from common/chain_metrics.py. The rounds don't touch sys.path themselves: each
+round's conftest.py, the benchmark loader and scripts such as bench_prefilter.py
+make this directory importable.
+"""
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+class DecisionCache:
+    """Bounded LRU mapping a request to the handler that processed it."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, request):
+        try:
+            handler = self._entries[request]
+        except (KeyError, TypeError):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(request)
+        self.hits += 1
+        return handler
+
+    def put(self, request, handler):
+        try:
+            self._entries[request] = handler
+        except TypeError:
+            return  # Unhashable requests are never cached.
+        self._entries.move_to_end(request)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, request):
+        self._entries.pop(request, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
@@ -0,0 +1,79 @@
+"""Mostly-miss workload with and without Bloom prefilters.
+
+Every handler accepts a set of keys and checks them with a linear scan, like a
+handler with a non-trivial predicate. 95% of requests match no handler and end
+at the default handler. Run from this directory: python bench_prefilter.py
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+# Like conftest.py does for the tests: make the shared chain_common and chain_metrics importable.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[3] / "common"))
+
+from chain_of_responsibility import BloomFilter, ChainOfResponsibility, Handler
+
+HANDLERS = 100
+KEYS_PER_HANDLER = 200
+REQUESTS = 5000
+MISS_RATIO = 0.95
+FALSE_POSITIVE_RATES = [None, 0.1, 0.01, 0.001]
+
+
+class ListHandler(Handler):
+    """Predicate handler that scans its accepted keys."""
+
+    def __init__(self, accepts, false_positive_rate):
+        self.accepts = list(accepts)
+        if false_positive_rate is not None:
+            self.prefilter = BloomFilter.from_keys(self.accepts, false_positive_rate)
+
+    def handle_request(self, request):
+        return request in self.accepts
+
+
+def build_chain(false_positive_rate):
+    chain = ChainOfResponsibility()
+    for h in range(HANDLERS):
+        keys = [f"{h}-{k}" for k in range(KEYS_PER_HANDLER)]
+        chain.add_handler(ListHandler(keys, false_positive_rate))
+    return chain
+
+
+def workload(seed=0):
+    rng = random.Random(seed)
+    requests = []
+    for n in range(REQUESTS):
+        if rng.random() < MISS_RATIO:
+            requests.append(f"miss-{n}")
+        else:
+            requests.append(f"{rng.randrange(HANDLERS)}-{rng.randrange(KEYS_PER_HANDLER)}")
+    return requests
+
+
+def main():
+    requests = workload()
+    print(f"{'fp rate':>8} {'filter bytes':>13} {'us/request':>11} {'speedup':>8}")
+    baseline = None
+    for rate in FALSE_POSITIVE_RATES:
+        chain = build_chain(rate)
+        filter_bytes = sum(
+            handler.prefilter.memory_bytes for handler in chain._handlers if handler.prefilter is not None
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for request in requests:
+                chain.handle_request(request)
+            elapsed = time.perf_counter() - start
+        per_request = elapsed / len(requests) * 1e6
+        baseline = baseline or per_request
+        label = "off" if rate is None else f"{rate:g}"
+        print(f"{label:>8} {filter_bytes:>13} {per_request:>11.2f} {baseline / per_request:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,124 @@
 from abc import ABC, abstractmethod
+from heapq import merge
+from math import ceil, log
+from operator import itemgetter
+from threading import Lock
+from time import perf_counter_ns
+
+from chain_common import CacheInfo, DecisionCache
+from chain_metrics import LATENCY_BUCKETS_NS, ChainMetrics, HandlerStats
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value):
+    """Scrambles a hash with the splitmix64 finalizer so that nearby inputs land far apart.
+
+    hash() of a small int is the int itself; without mixing, its high half is 0 and
+    every key would probe a run of adjacent bits.
+    """
+    value &= _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _next_prime(n):
+    """Returns the smallest prime >= n."""
+    while any(n % d == 0 for d in range(2, int(n ** 0.5) + 1)):
+        n += 1
+    return n
+
+
+class BloomFilter:
+    """Compact probabilistic set: `x in f` is never False for an added key.
+
+    Memory and false-positive rate trade off against each other: for `capacity` keys,
+    the filter uses about -capacity * ln(false_positive_rate) / ln(2)**2 bits.
+    """
+
+    def __init__(self, capacity, false_positive_rate=0.01):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+        # A prime size keeps every probe sequence full length whatever the step is.
+        self.size = _next_prime(max(8, ceil(-capacity * log(false_positive_rate) / log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_keys(cls, keys, false_positive_rate=0.01):
+        """Builds a filter sized for the given keys and containing all of them."""
+        keys = list(keys)
+        bloom = cls(max(1, len(keys)), false_positive_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def add(self, key):
+        # Double hashing: hash_count bit positions derived from the two halves of one hash.
+        size, bits = self.size, self._bits
+        value = _mix(hash(key))
+        first, second = value & 0xFFFFFFFF, (value >> 32) % (size - 1) + 1
+        for i in range(self.hash_count):
+            position = (first + i * second) % size
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        try:
+            value = _mix(hash(key))
+        except TypeError:
+            return True  # Unhashable keys can't be ruled out.
+        size, bits = self.size, self._bits
+        first, second = value & 0xFFFFFFFF, (value >> 32) % (size - 1) + 1
+        for i in range(self.hash_count):
+            position = (first + i * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def memory_bytes(self):
+        """Size of the bit array in bytes."""
+        return len(self._bits)
 
 
 class Handler(ABC):
     """Abstract Handler class."""
 
+    # Exact request keys this handler accepts. None means the handler uses an
+    # arbitrary predicate and has to be asked about every request.
+    keys = None
+
+    # True if the handler may be moved relative to other order-independent handlers
+    # without changing which one processes a request. Adaptive chains only reorder
+    # these; every other handler stays pinned at its position.
+    order_independent = False
+
+    # Optional membership filter (anything supporting `in`, such as a BloomFilter)
+    # over the requests this handler can accept. The chain skips the handler when
+    # the filter rules a request out.
+    prefilter = None
+
     @abstractmethod
     def handle_request(self, request):
         pass
 
+    def handle_batch(self, requests):
+        """Handles a list of requests routed to this handler, returning one result per request.
+
+        Batch-aware handlers override this to process the whole group in one call.
+        """
+        handle_request = self.handle_request
+        return [handle_request(request) for request in requests]
+
 
 class ConcreteHandler1(Handler):
     """Concrete handler 1."""
 
+    keys = frozenset({"A"})
+
     def handle_request(self, request):
         if request == "A":
             print("Handler 1 processed request A.")
@@ -23,6 +130,8 @@ class ConcreteHandler1(Handler):
 class ConcreteHandler2(Handler):
     """Concrete handler 2."""
 
+    keys = frozenset({"B"})
+
     def handle_request(self, request):
         if request == "B":
             print("Handler 2 processed request B.")
@@ -40,23 +149,234 @@ class DefaultHandler(Handler):
 
 
 class ChainOfResponsibility:
-    """Chain of Responsibility pattern implementation."""
+    """Chain of Responsibility pattern implementation.
+
+    Pass cache_size to remember, per request, which handler processed it. Repeated
+    requests then go straight to that handler. Only use it when the handler chosen
+    depends on the request value alone.
+
+    Pass adaptive=True to let the chain reorder its order-independent handlers every
+    reorder_every requests, by measured match rate divided by evaluation cost.
+    """
 
-    def __init__(self):
+    def __init__(self, cache_size=None, adaptive=False, reorder_every=1000):
         self._handlers = []
+        # (key -> [(position, handler), ...] for handlers that declare keys,
+        #  [(position, handler), ...] for handlers without declared keys).
+        # Replaced as a whole when the order changes, so requests in flight keep
+        # a consistent view.
+        self._routing = ({}, [])
+        self._default_handler = DefaultHandler()
+        self._cache = None if cache_size is None else DecisionCache(cache_size)
+        self._metrics = None
+        # id(handler) -> [asked, matched, nanoseconds] for order-independent handlers
+        self._selectivity = {} if adaptive else None
+        self._reorder_every = reorder_every
+        self._until_reorder = reorder_every
+        self._reorder_lock = Lock()
 
     def add_handler(self, handler: Handler):
         """Adds a handler to the chain."""
-        self._handlers.append(handler)
+        with self._reorder_lock:
+            handlers = [*self._handlers, handler]
+            self._routing = self._build_routing(handlers)
+            self._handlers = handlers
+            if self._cache is not None:
+                self._cache.clear()
+
+    @staticmethod
+    def _build_routing(handlers):
+        """Returns a fresh (index, fallback) pair for handlers in this order."""
+        index, fallback = {}, []
+        for position, handler in enumerate(handlers):
+            entry = (position, handler)
+            if handler.keys is None:
+                fallback.append(entry)
+            else:
+                for key in handler.keys:
+                    index.setdefault(key, []).append(entry)
+        return index, fallback
+
+    def _candidates(self, request, routing=None):
+        """Returns the (position, handler) pairs that may accept the request, in chain order."""
+        index, fallback = self._routing if routing is None else routing
+        try:
+            keyed = index.get(request)
+        except TypeError:
+            # Unhashable requests can only be matched by predicate handlers.
+            keyed = None
+        if not keyed:
+            return fallback
+        if not fallback:
+            return keyed
+        return merge(keyed, fallback, key=itemgetter(0))
+
+    def reorder(self):
+        """Sorts each run of adjacent order-independent handlers by matches per nanosecond.
+
+        Handlers that have not been measured yet move to the front of their run so they
+        get measured. Pinned handlers never move. Statistics are halved afterwards so the
+        order keeps following the traffic.
+        """
+        with self._reorder_lock:
+            stats = self._selectivity or {}
+
+            def score(handler):
+                asked, matched, elapsed = stats.get(id(handler), (0, 0, 0))
+                return float("inf") if not asked else matched / max(elapsed, 1)
+
+            handlers = list(self._handlers)
+            start = 0
+            while start < len(handlers):
+                if not handlers[start].order_independent:
+                    start += 1
+                    continue
+                end = start
+                while end < len(handlers) and handlers[end].order_independent:
+                    end += 1
+                handlers[start:end] = sorted(handlers[start:end], key=score, reverse=True)
+                start = end
+
+            self._routing = self._build_routing(handlers)
+            self._handlers = handlers
+            for entry in stats.values():
+                entry[0] //= 2
+                entry[1] //= 2
+                entry[2] //= 2
+
+    def enable_metrics(self, metrics=None):
+        """Starts measuring every handler the chain asks. Returns the ChainMetrics in use."""
+        self._metrics = ChainMetrics() if metrics is None else metrics
+        return self._metrics
+
+    def disable_metrics(self):
+        """Stops measuring handlers."""
+        self._metrics = None
+
+    @property
+    def metrics(self):
+        """The ChainMetrics in use, or None if metrics are off."""
+        return self._metrics
+
+    def _ask(self, handler, request):
+        """Asks one handler about the request, timing it when metrics or adaptive ordering are on."""
+        metrics = self._metrics
+        stats = self._selectivity
+        if metrics is None and stats is None:
+            return handler.handle_request(request)
+        start = perf_counter_ns()
+        accepted = handler.handle_request(request)
+        elapsed = perf_counter_ns() - start
+        if metrics is not None:
+            metrics.record(handler, accepted, elapsed)
+        if stats is not None and handler.order_independent:
+            entry = stats.get(id(handler))
+            if entry is None:
+                entry = stats.setdefault(id(handler), [0, 0, 0])
+            entry[0] += 1
+            entry[1] += 1 if accepted else 0
+            entry[2] += elapsed
+        return accepted
+
+    def _ask_batch(self, handler, requests):
+        """Passes a group of requests to a handler, timing it when metrics are enabled."""
+        metrics = self._metrics
+        if metrics is None:
+            return handler.handle_batch(requests)
+        start = perf_counter_ns()
+        handled = handler.handle_batch(requests)
+        elapsed = perf_counter_ns() - start
+        accepted = sum(1 for result in handled if result)
+        if accepted:
+            metrics.record(handler, True, elapsed * accepted // len(requests), accepted)
+        if accepted < len(requests):
+            declined = len(requests) - accepted
+            metrics.record(handler, False, elapsed * declined // len(requests), declined)
+        return handled
+
+    def cache_info(self):
+        """Returns hit/miss counters for the decision cache, or None if it is off."""
+        return None if self._cache is None else self._cache.info()
 
     def handle_request(self, request):
         """Processes the request through the chain."""
-        for handler in self._handlers:
-            if handler.handle_request(request):
+        if self._selectivity is not None:
+            self._until_reorder -= 1
+            if self._until_reorder <= 0:
+                self._until_reorder = self._reorder_every
+                self.reorder()
+
+        cache = self._cache
+        if cache is not None:
+            handler = cache.get(request)
+            if handler is not None:
+                if self._ask(handler, request):
+                    return
+                cache.discard(request)
+
+        measured = self._metrics is not None or self._selectivity is not None
+        for _, handler in self._candidates(request):
+            prefilter = handler.prefilter
+            if prefilter is not None and request not in prefilter:
+                continue
+            if not measured:
+                accepted = handler.handle_request(request)
+            else:
+                accepted = self._ask(handler, request)
+            if accepted:
+                if cache is not None:
+                    cache.put(request, handler)
                 return
 
         # No handler found, reach the default handler
-        DefaultHandler().handle_request(request)
+        self._ask(self._default_handler, request)
+        if cache is not None:
+            cache.put(request, self._default_handler)
+
+    def handle_many(self, requests):
+        """Processes a batch of requests in one pass.
+
+        Requests are grouped by the keyed handler they resolve to, and each group is
+        passed to that handler's handle_batch() once. Handlers without declared keys
+        are still asked one request at a time, in chain order. Returns the handler
+        that processed each request, in input order.
+        """
+        requests = list(requests)
+        results = [None] * len(requests)
+        routing = self._routing
+        default_position = len(self._handlers)
+        # (index, position of the last handler that declined it)
+        pending = [(index, -1) for index in range(len(requests))]
+        while pending:
+            groups = {}
+            for index, declined_at in pending:
+                request = requests[index]
+                for position, handler in self._candidates(request, routing):
+                    if position <= declined_at:
+                        continue
+                    if handler.keys is not None:
+                        groups.setdefault(position, (handler, []))[1].append(index)
+                        break
+                    prefilter = handler.prefilter
+                    if prefilter is not None and request not in prefilter:
+                        continue
+                    if self._ask(handler, request):
+                        results[index] = handler
+                        break
+                else:
+                    groups.setdefault(
+                        default_position, (self._default_handler, [])
+                    )[1].append(index)
+
+            pending = []
+            for position, (handler, indexes) in groups.items():
+                handled = self._ask_batch(handler, [requests[index] for index in indexes])
+                for index, accepted in zip(indexes, handled):
+                    if accepted:
+                        results[index] = handler
+                    else:
+                        pending.append((index, position))
+        return results
 
 
 # Test cases
@@ -1,6 +1,11 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from chain_of_responsibility import (
+    BloomFilter,
     ChainOfResponsibility,
+    Handler,
     ConcreteHandler1,
     ConcreteHandler2,
     DefaultHandler,
@@ -19,10 +24,10 @@ class MockHandler(Handler):
 
 
 @pytest.mark.parametrize(
-    "request, expected_handler",
+    "req, expected_handler",
     [("A", ConcreteHandler1), ("B", ConcreteHandler2), ("C", DefaultHandler)],
 )
-def test_handle_request(request, expected_handler, monkeypatch):
+def test_handle_request(req, expected_handler, monkeypatch):
     """Test that the correct handler is called for each request."""
     chain = ChainOfResponsibility()
     chain.add_handler(ConcreteHandler1())
@@ -46,22 +51,14 @@ def test_handle_request(request, expected_handler, monkeypatch):
         mock_default_handler.handle_request,
     )
 
-    chain.handle_request(request)
+    chain.handle_request(req)
 
-    # Assert that the correct handler was called
+    # Assert that only the handler declaring the key was asked. The mocks
+    # always pass the request on, so it ends at the default handler.
     assert expected_handler is not None
-    if expected_handler == ConcreteHandler1:
-        assert mock_handler1.handled is True
-        assert mock_handler2.handled is False
-        assert mock_default_handler.handled is False
-    elif expected_handler == ConcreteHandler2:
-        assert mock_handler1.handled is True
-        assert mock_handler2.handled is True
-        assert mock_default_handler.handled is False
-    elif expected_handler == DefaultHandler:
-        assert mock_handler1.handled is True
-        assert mock_handler2.handled is True
-        assert mock_default_handler.handled is True
+    assert mock_handler1.handled is (expected_handler == ConcreteHandler1)
+    assert mock_handler2.handled is (expected_handler == ConcreteHandler2)
+    assert mock_default_handler.handled is True
 
 
 def test_add_handler():
@@ -70,3 +67,385 @@ def test_add_handler():
     chain.add_handler(ConcreteHandler1())
     assert len(chain._handlers) == 1
     assert isinstance(chain._handlers[0], ConcreteHandler1)
+
+
+def test_add_handler_leaves_routing_in_flight_untouched():
+    """A request that already read the routing keeps that view while a handler is added."""
+    chain = ChainOfResponsibility()
+    chain.add_handler(ConcreteHandler1())
+    routing = chain._routing
+    index, fallback = routing
+    before = ({key: list(entries) for key, entries in index.items()}, list(fallback))
+
+    chain.add_handler(ConcreteHandler2())
+    chain.add_handler(MockHandler())
+
+    assert routing == before
+    assert chain._routing is not routing
+    assert [handler for _, handler in chain._candidates("B")][-2:] == chain._handlers[1:]
+
+
+class RecordingHandler(Handler):
+    """Handler that records every request it is asked about."""
+
+    def __init__(self, keys=None, accepts=()):
+        if keys is not None:
+            self.keys = frozenset(keys)
+        self.accepts = list(accepts if keys is None else keys)
+        self.seen = []
+
+    def handle_request(self, request):
+        self.seen.append(request)
+        return request in self.accepts
+
+
+def test_keyed_handler_skips_other_keyed_handlers():
+    """Keyed handlers are only asked about the keys they declare."""
+    chain = ChainOfResponsibility()
+    handlers = [RecordingHandler(keys=[i]) for i in range(100)]
+    for handler in handlers:
+        chain.add_handler(handler)
+
+    chain.handle_request(99)
+
+    assert handlers[99].seen == [99]
+    assert all(handler.seen == [] for handler in handlers[:99])
+
+
+def test_predicate_handler_keeps_first_match_order():
+    """A predicate handler ahead of a keyed handler still gets the first chance."""
+    chain = ChainOfResponsibility()
+    keyed_first = RecordingHandler(keys=["x"])
+    predicate = RecordingHandler(accepts=["x", "y"])
+    keyed_last = RecordingHandler(keys=["y"])
+    chain.add_handler(keyed_first)
+    chain.add_handler(predicate)
+    chain.add_handler(keyed_last)
+
+    chain.handle_request("x")
+    chain.handle_request("y")
+
+    assert keyed_first.seen == ["x"]
+    assert predicate.seen == ["y"]
+    assert keyed_last.seen == []
+
+
+def test_declining_keyed_handler_falls_through():
+    """A keyed handler that returns False passes the request on."""
+    chain = ChainOfResponsibility()
+    declining = RecordingHandler(keys=["x"])
+    declining.accepts = []
+    predicate = RecordingHandler(accepts=["x"])
+    chain.add_handler(declining)
+    chain.add_handler(predicate)
+
+    chain.handle_request("x")
+
+    assert declining.seen == ["x"]
+    assert predicate.seen == ["x"]
+
+
+def test_unhashable_request_uses_predicate_scan(capsys):
+    """Unhashable requests skip the index and reach the default handler."""
+    chain = ChainOfResponsibility()
+    keyed = RecordingHandler(keys=["A"])
+    predicate = RecordingHandler()
+    chain.add_handler(keyed)
+    chain.add_handler(predicate)
+
+    chain.handle_request(["A"])
+
+    assert keyed.seen == []
+    assert predicate.seen == [["A"]]
+    assert "Default handler processed request." in capsys.readouterr().out
+
+
+class BatchRecordingHandler(RecordingHandler):
+    """Keyed handler that records the batches it receives."""
+
+    def __init__(self, keys):
+        super().__init__(keys=keys)
+        self.batches = []
+
+    def handle_batch(self, requests):
+        self.batches.append(list(requests))
+        return [request in self.accepts for request in requests]
+
+
+def test_handle_many_groups_requests_by_handler(capsys):
+    """Each batch-aware handler is called once, and results keep input order."""
+    chain = ChainOfResponsibility()
+    first = BatchRecordingHandler(keys=["x", "y"])
+    second = BatchRecordingHandler(keys=["z"])
+    chain.add_handler(first)
+    chain.add_handler(second)
+
+    results = chain.handle_many(iter(["z", "x", "q", "y", "z"]))
+
+    assert first.batches == [["x", "y"]]
+    assert second.batches == [["z", "z"]]
+    assert results[:2] == [second, first]
+    assert isinstance(results[2], DefaultHandler)
+    assert results[3:] == [first, second]
+    assert capsys.readouterr().out.count("Default handler processed request.") == 1
+
+
+def test_handle_many_resumes_after_declining_handler():
+    """Requests declined inside a batch continue down the chain."""
+    chain = ChainOfResponsibility()
+    declining = BatchRecordingHandler(keys=["x"])
+    declining.accepts = []
+    predicate = RecordingHandler(accepts=["x"])
+    chain.add_handler(declining)
+    chain.add_handler(predicate)
+
+    results = chain.handle_many(["x", "x"])
+
+    assert declining.batches == [["x", "x"]]
+    assert predicate.seen == ["x", "x"]
+    assert results == [predicate, predicate]
+
+
+def test_handle_many_matches_handle_request(capsys):
+    """Batch routing prints the same lines as handling requests one by one."""
+    chain = ChainOfResponsibility()
+    chain.add_handler(ConcreteHandler1())
+    chain.add_handler(ConcreteHandler2())
+
+    for req in ["A", "B", "C"]:
+        chain.handle_request(req)
+    one_by_one = sorted(capsys.readouterr().out.splitlines())
+
+    results = chain.handle_many(["A", "B", "C"])
+    batched = sorted(capsys.readouterr().out.splitlines())
+
+    assert batched == one_by_one
+    assert [type(handler) for handler in results] == [
+        ConcreteHandler1,
+        ConcreteHandler2,
+        DefaultHandler,
+    ]
+
+
+def test_decision_cache_skips_chain_walk():
+    """Repeated requests go straight to the cached handler."""
+    chain = ChainOfResponsibility(cache_size=2)
+    predicates = [RecordingHandler(accepts=[i]) for i in range(10)]
+    for handler in predicates:
+        chain.add_handler(handler)
+
+    chain.handle_request(9)
+    chain.handle_request(9)
+    chain.handle_request(9)
+
+    assert predicates[0].seen == [9]
+    assert predicates[9].seen == [9, 9, 9]
+    assert chain.cache_info() == (2, 1, 2, 1)
+
+
+def test_decision_cache_is_bounded_lru(capsys):
+    """The least recently used entry is evicted first."""
+    chain = ChainOfResponsibility(cache_size=2)
+    first = RecordingHandler(accepts=["a", "b", "c"])
+    chain.add_handler(first)
+
+    for req in ["a", "b", "a", "c", "a", "b"]:
+        chain.handle_request(req)
+
+    info = chain.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 4, 2)
+
+
+def test_decision_cache_invalidated_by_add_handler(capsys):
+    """Adding a handler clears cached decisions."""
+    chain = ChainOfResponsibility(cache_size=8)
+    chain.handle_request("x")
+    assert chain.cache_info().currsize == 1
+
+    late = RecordingHandler(accepts=["x"])
+    chain.add_handler(late)
+    assert chain.cache_info().currsize == 0
+    chain.handle_request("x")
+
+    assert late.seen == ["x"]
+    assert capsys.readouterr().out.count("Default handler processed request.") == 1
+
+
+def test_decision_cache_recovers_from_declining_handler(capsys):
+    """A cached handler that declines sends the request down the chain again."""
+    chain = ChainOfResponsibility(cache_size=8)
+    flaky = RecordingHandler(accepts=["x"])
+    chain.add_handler(flaky)
+    chain.handle_request("x")
+    flaky.accepts = []
+    chain.handle_request("x")
+    chain.handle_request(["unhashable"])
+
+    assert flaky.seen == ["x", "x", "x", ["unhashable"]]
+    assert "Default handler processed request." in capsys.readouterr().out
+    assert chain.cache_info() is not None
+    assert ChainOfResponsibility().cache_info() is None
+
+
+def test_metrics_count_seen_handled_and_passed(capsys):
+    """Metrics record every handler the chain asks."""
+    chain = ChainOfResponsibility()
+    first = RecordingHandler(accepts=["a"])
+    second = RecordingHandler(accepts=["b"])
+    chain.add_handler(first)
+    chain.add_handler(second)
+    metrics = chain.enable_metrics()
+
+    for req in ["a", "b", "c"]:
+        chain.handle_request(req)
+    chain.handle_many(["a", "c"])
+
+    stats = {id(stat.handler): stat for stat in metrics.snapshot()}
+    assert stats[id(first)][1:4] == (5, 2, 3)
+    assert stats[id(second)][1:4] == (3, 1, 2)
+    default = stats[id(chain._default_handler)]
+    assert default[1:4] == (2, 2, 0)
+    assert sum(default.latency_histogram) == 2
+    assert len(default.latency_histogram) == len(metrics.buckets) + 1
+
+
+def test_metrics_batch_groups_and_disable(capsys):
+    """Batch groups are counted per request, and disabled metrics record nothing."""
+    chain = ChainOfResponsibility()
+    keyed = BatchRecordingHandler(keys=["x", "y"])
+    keyed.accepts = ["x"]
+    chain.add_handler(keyed)
+    metrics = chain.enable_metrics()
+
+    chain.handle_many(["x", "y", "x"])
+    assert metrics.snapshot()[0][1:4] == (3, 2, 1)
+
+    chain.disable_metrics()
+    chain.handle_request("x")
+    assert chain.metrics is None
+    assert metrics.snapshot()[0].seen == 3
+
+    metrics.reset()
+    assert metrics.snapshot() == []
+
+
+class TimedHandler(RecordingHandler):
+    """Order-independent predicate handler with a fixed evaluation cost."""
+
+    order_independent = True
+
+    def __init__(self, accepts, cost):
+        super().__init__(accepts=accepts)
+        self.cost = cost
+
+    def handle_request(self, request):
+        deadline = time.perf_counter() + self.cost
+        while time.perf_counter() < deadline:
+            pass
+        return super().handle_request(request)
+
+
+def test_adaptive_chain_moves_hot_cheap_handler_forward(capsys):
+    """Order-independent handlers are sorted by match rate over cost; pinned ones stay."""
+    chain = ChainOfResponsibility(adaptive=True, reorder_every=50)
+    pinned = RecordingHandler(accepts=["pinned"])
+    slow_rare = TimedHandler(accepts=["rare"], cost=0.0002)
+    fast_hot = TimedHandler(accepts=["hot"], cost=0.0)
+    chain.add_handler(pinned)
+    chain.add_handler(slow_rare)
+    chain.add_handler(fast_hot)
+
+    for n in range(200):
+        chain.handle_request("rare" if n % 20 == 0 else "hot")
+
+    assert chain._handlers == [pinned, fast_hot, slow_rare]
+    fast_hot.seen.clear()
+    slow_rare.seen.clear()
+    chain.handle_request("hot")
+    chain.handle_request("rare")
+    assert slow_rare.seen == ["rare"]
+    assert fast_hot.seen == ["hot", "rare"]
+
+
+def test_reorder_keeps_runs_between_pinned_handlers():
+    """Independent handlers never cross a pinned handler."""
+    chain = ChainOfResponsibility(adaptive=True)
+    first = TimedHandler(accepts=[], cost=0.0)
+    pinned = RecordingHandler(accepts=["x"])
+    last = TimedHandler(accepts=["x"], cost=0.0)
+    for handler in (first, pinned, last):
+        chain.add_handler(handler)
+
+    for _ in range(10):
+        chain.handle_request("x")
+    chain.reorder()
+
+    assert chain._handlers == [first, pinned, last]
+    assert last.seen == []
+
+
+def test_reorder_is_safe_with_requests_in_flight(capsys):
+    """Concurrent reordering never changes which handler processes a request."""
+    chain = ChainOfResponsibility(adaptive=True, reorder_every=7)
+    handlers = [TimedHandler(accepts=[i], cost=0.0) for i in range(20)]
+    for handler in handlers:
+        chain.add_handler(handler)
+
+    def run(offset):
+        for n in range(300):
+            chain.handle_request((n + offset) % 20)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(run, range(4)))
+
+    assert all(handler.seen.count(i) == 60 for i, handler in enumerate(handlers))
+    assert sorted(map(id, chain._handlers)) == sorted(map(id, handlers))
+
+
+def test_bloom_filter_has_no_false_negatives_and_tunable_rate():
+    """Added keys are always found, and the false-positive rate follows the knob."""
+    keys = [f"key-{i}" for i in range(2000)]
+    loose = BloomFilter.from_keys(keys, false_positive_rate=0.1)
+    tight = BloomFilter.from_keys(keys, false_positive_rate=0.001)
+
+    assert all(key in loose and key in tight for key in keys)
+    misses = [f"miss-{i}" for i in range(20000)]
+    loose_rate = sum(miss in loose for miss in misses) / len(misses)
+    tight_rate = sum(miss in tight for miss in misses) / len(misses)
+    assert loose_rate < 0.2
+    assert tight_rate < 0.01
+    assert tight.memory_bytes > loose.memory_bytes
+    assert ["unhashable"] in tight
+
+    with pytest.raises(ValueError):
+        BloomFilter(0)
+    with pytest.raises(ValueError):
+        BloomFilter(10, false_positive_rate=1.0)
+
+
+def test_bloom_filter_spreads_interleaved_int_keys():
+    """Small ints hash to themselves; the even ones must not cover the odd ones."""
+    bloom = BloomFilter.from_keys(range(0, 20000, 2), false_positive_rate=0.01)
+
+    assert all(key in bloom for key in range(0, 20000, 2))
+    rate = sum(key in bloom for key in range(1, 20000, 2)) / 10000
+    assert rate < 0.02
+
+
+def test_prefilter_skips_handlers_that_cannot_match(capsys):
+    """Handlers whose filter rules a request out are never asked."""
+    chain = ChainOfResponsibility()
+    filtered = RecordingHandler(accepts=["a", "b"])
+    filtered.prefilter = BloomFilter(capacity=1000, false_positive_rate=0.0001)
+    filtered.prefilter.add("a")
+    filtered.prefilter.add("b")
+    plain = RecordingHandler(accepts=["c"])
+    chain.add_handler(filtered)
+    chain.add_handler(plain)
+
+    for req in ["a", "c", "zzz"]:
+        chain.handle_request(req)
+    chain.handle_many(["b", "zzz"])
+
+    assert filtered.seen == ["a", "b"]
+    assert plain.seen == ["c", "zzz", "zzz"]
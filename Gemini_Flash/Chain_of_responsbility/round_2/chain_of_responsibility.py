@@ -1,39 +1,128 @@
 from abc import ABC, abstractmethod
+from enum import Enum
+from time import perf_counter_ns
+
+from chain_metrics import LATENCY_BUCKETS_NS, ChainMetrics, HandlerStats
+
+
+class Outcome(Enum):
+    """What a handler did with a request. Any other value returned by process() is a transformed request."""
+    HANDLED = "handled"
+    PASS = "pass"
+
 
 class Handler(ABC):
     """Abstract Handler class for the Chain of Responsibility pattern."""
     _next_handler = None
+    _metrics = None
+    # True for handlers that handle every request; nothing after them can run.
+    always_handles = False
 
     def set_next(self, handler):
         """Sets the next handler in the chain."""
         self._next_handler = handler
         return handler
 
-    @abstractmethod
+    def freeze(self):
+        """Compiles the chain from this handler into an immutable FrozenChain.
+
+        Raises ValueError if the chain loops back on itself. Handlers after one that
+        always handles requests can never run and are left out.
+        """
+        handlers = []
+        seen = set()
+        handler = self
+        while handler:
+            if id(handler) in seen:
+                raise ValueError("chain contains a cycle")
+            seen.add(id(handler))
+            handlers.append(handler)
+            if handler.always_handles:
+                break
+            handler = handler._next_handler
+        return FrozenChain(handlers)
+
+    def enable_metrics(self, metrics=None):
+        """Starts measuring every hop of requests started at this handler. Returns the ChainMetrics in use."""
+        self._metrics = ChainMetrics() if metrics is None else metrics
+        return self._metrics
+
+    def disable_metrics(self):
+        """Stops measuring hops."""
+        self._metrics = None
+
+    @property
+    def metrics(self):
+        """The ChainMetrics in use, or None if metrics are off."""
+        return self._metrics
+
     def handle(self, request):
-        """Handles the request if applicable. If not, passes it to the next handler."""
+        """Walks the chain from this handler in a loop. Returns True if a handler handled the request."""
+        metrics = self._metrics
+        handler = self
+        while handler is not None:
+            if metrics is None:
+                outcome = handler.process(request)
+            else:
+                start = perf_counter_ns()
+                outcome = handler.process(request)
+                metrics.record(handler, outcome is Outcome.HANDLED, perf_counter_ns() - start)
+            if outcome is Outcome.HANDLED:
+                return True
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            handler = handler._next_handler
+        return False  # Return False if no handler found
+
+    @abstractmethod
+    def process(self, request):
+        """Handles the request if applicable.
+
+        Returns Outcome.HANDLED, Outcome.PASS (or None) to pass the request on
+        unchanged, or a transformed request to pass on instead.
+        """
         pass
 
+class FrozenChain:
+    """Immutable execution plan: the chain's process() methods, bound once, in order."""
+    __slots__ = ("_handlers", "_steps")
+
+    def __init__(self, handlers):
+        self._handlers = tuple(handlers)
+        self._steps = tuple(handler.process for handler in self._handlers)
+
+    @property
+    def handlers(self):
+        return self._handlers
+
+    def __len__(self):
+        return len(self._steps)
+
+    def handle(self, request):
+        """Runs the plan. Returns True if a handler handled the request."""
+        for process in self._steps:
+            outcome = process(request)
+            if outcome is Outcome.HANDLED:
+                return True
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+        return False
+
+    def set_next(self, handler):
+        raise TypeError("a frozen chain cannot be changed")
+
 class ConcreteHandler1(Handler):
     """Concrete handler that handles specific requests."""
-    def handle(self, request):
+    def process(self, request):
         if request == "Request 1":
             print(f"ConcreteHandler1 handling request: {request}")
-            return True
-        else:
-            if self._next_handler is not None:
-                return self._next_handler.handle(request)
-            else:
-                return False  # Return False if no handler found
+            return Outcome.HANDLED
+        return Outcome.PASS
 
 class ConcreteHandler2(Handler):
     """Concrete handler that handles specific requests."""
-    def handle(self, request):
+    def process(self, request):
         if request == "Request 2":
             print(f"ConcreteHandler2 handling request: {request}")
-            return True
-        else:
-            if self._next_handler is not None:
-                return self._next_handler.handle(request)
-            else:
-                return False  # Return False if no handler found
+            return Outcome.HANDLED
+        return Outcome.PASS
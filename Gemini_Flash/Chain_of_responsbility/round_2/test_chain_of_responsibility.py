@@ -1,5 +1,5 @@
 import pytest
-from chain_of_responsibility import ConcreteHandler1, ConcreteHandler2, Handler
+from chain_of_responsibility import ConcreteHandler1, ConcreteHandler2, Handler, Outcome
 
 def test_chain_of_responsibility():
     # Create the chain of handlers
@@ -22,3 +22,84 @@ def test_no_handler():
 
     # Test an unknown request
     assert handler1.handle("Request 3") == False
+
+def test_deep_chain_does_not_recurse():
+    # Longer than the default recursion limit
+    head = ConcreteHandler2()
+    handler = head
+    for _ in range(5000):
+        handler = handler.set_next(ConcreteHandler2())
+    handler.set_next(ConcreteHandler1())
+
+    assert head.handle("Request 1") == True
+    assert head.handle("Request 3") == False
+
+def test_transformed_request_is_passed_on():
+    class Renamer(Handler):
+        def process(self, request):
+            return "Request 2"
+
+    renamer = Renamer()
+    renamer.set_next(ConcreteHandler2())
+
+    assert renamer.handle("anything") == True
+
+def test_metrics_per_hop():
+    handler1 = ConcreteHandler1()
+    handler2 = ConcreteHandler2()
+    handler1.set_next(handler2)
+    metrics = handler1.enable_metrics()
+
+    handler1.handle("Request 1")
+    handler1.handle("Request 2")
+    handler1.handle("Request 3")
+
+    stats = metrics.snapshot()
+    assert [stat.handler for stat in stats] == [handler1, handler2]
+    assert stats[0][1:4] == (3, 1, 2)
+    assert stats[1][1:4] == (2, 1, 1)
+    assert sum(stats[1].latency_histogram) == 2
+
+    handler1.disable_metrics()
+    handler1.handle("Request 1")
+    assert handler1.metrics is None
+    assert metrics.snapshot()[0].seen == 3
+
+def test_freeze_runs_same_as_live_chain():
+    handler1 = ConcreteHandler1()
+    handler2 = ConcreteHandler2()
+    handler1.set_next(handler2)
+    frozen = handler1.freeze()
+
+    assert frozen.handlers == (handler1, handler2)
+    assert frozen.handle("Request 1") == True
+    assert frozen.handle("Request 2") == True
+    assert frozen.handle("Request 3") == False
+
+    # Later changes to the live chain don't reach the plan
+    handler2.set_next(ConcreteHandler1())
+    assert len(frozen) == 2
+    with pytest.raises(TypeError):
+        frozen.set_next(handler1)
+    with pytest.raises(AttributeError):
+        frozen.extra = 1
+
+def test_freeze_detects_cycles_and_drops_unreachable():
+    handler1 = ConcreteHandler1()
+    handler2 = ConcreteHandler2()
+    handler1.set_next(handler2).set_next(handler1)
+    with pytest.raises(ValueError):
+        handler1.freeze()
+
+    class CatchAll(Handler):
+        always_handles = True
+
+        def process(self, request):
+            return Outcome.HANDLED
+
+    catch_all = CatchAll()
+    head = ConcreteHandler1()
+    head.set_next(catch_all).set_next(ConcreteHandler2())
+    frozen = head.freeze()
+    assert frozen.handlers == (head, catch_all)
+    assert frozen.handle("anything") == True
@@ -1,46 +1,195 @@
 from abc import ABC, abstractmethod
+from enum import Enum
+from time import perf_counter_ns
+
+from chain_common import CacheInfo, DecisionCache
+from chain_metrics import LATENCY_BUCKETS_NS, ChainMetrics, HandlerStats
+
+class Outcome(Enum):
+    """What a handler did with a request. Any other value returned by process() is a transformed request."""
+    HANDLED = "handled"
+    PASS = "pass"
+
+class _DecisionCache(DecisionCache):
+    """DecisionCache that forgets its entries when any chain's links change."""
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.version = Handler._topology_version
+
+    def get(self, request):
+        if self.version != Handler._topology_version:
+            # Some set_next() call changed a chain since these entries were stored.
+            self.clear()
+            self.version = Handler._topology_version
+        return super().get(request)
 
 class Handler(ABC):
     """Abstract Handler class for the Chain of Responsibility pattern."""
 
-    @abstractmethod
+    # Bumped by every set_next() call so decision caches notice topology changes.
+    _topology_version = 0
+    _decision_cache = None
+    _metrics = None
+    # True for handlers that handle every request; nothing after them can run.
+    always_handles = False
+
+    def freeze(self):
+        """Compiles the chain from this handler into an immutable FrozenChain.
+
+        Raises ValueError if the chain loops back on itself. Handlers after one that
+        always handles requests can never run and are left out.
+        """
+        handlers = []
+        seen = set()
+        handler = self
+        while handler:
+            if id(handler) in seen:
+                raise ValueError("chain contains a cycle")
+            seen.add(id(handler))
+            handlers.append(handler)
+            if handler.always_handles:
+                break
+            handler = getattr(handler, "next_handler", None)
+        return FrozenChain(handlers)
+
+    def enable_metrics(self, metrics=None):
+        """Starts measuring every hop of requests started at this handler. Returns the ChainMetrics in use."""
+        self._metrics = ChainMetrics() if metrics is None else metrics
+        return self._metrics
+
+    def disable_metrics(self):
+        """Stops measuring hops."""
+        self._metrics = None
+
+    @property
+    def metrics(self):
+        """The ChainMetrics in use, or None if metrics are off."""
+        return self._metrics
+
+    def enable_cache(self, maxsize=128):
+        """Remembers which handler handled each request started at this handler.
+
+        Only use it when the handler chosen depends on the request value alone.
+        """
+        self._decision_cache = _DecisionCache(maxsize)
+
+    def cache_info(self):
+        """Returns hit/miss counters for the decision cache, or None if it is off."""
+        return None if self._decision_cache is None else self._decision_cache.info()
+
     def handle_request(self, request):
-        """Handles a request, optionally passing it to the next handler in the chain."""
+        """Handles a request, walking the chain from this handler in a loop.
+
+        Returns True if a handler handled the request and False if the chain ran out.
+        """
+        cache = self._decision_cache
+        metrics = self._metrics
+        if cache is not None:
+            handler = cache.get(request)
+            if handler is not None:
+                if metrics is None:
+                    outcome = handler.process(request)
+                else:
+                    start = perf_counter_ns()
+                    outcome = handler.process(request)
+                    metrics.record(handler, outcome is Outcome.HANDLED, perf_counter_ns() - start)
+                if outcome is Outcome.HANDLED:
+                    return True
+                cache.discard(request)
+
+        original = request
+        handler = self
+        while True:
+            if metrics is None:
+                outcome = handler.process(request)
+            else:
+                start = perf_counter_ns()
+                outcome = handler.process(request)
+                metrics.record(handler, outcome is Outcome.HANDLED, perf_counter_ns() - start)
+            if outcome is Outcome.HANDLED:
+                # A transformed request could resolve differently, so only cache untouched ones.
+                if cache is not None and request is original:
+                    cache.put(request, handler)
+                return True
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+            handler = handler.get_next()
+            if not handler:
+                return False
+
+    @abstractmethod
+    def process(self, request):
+        """Handles the request if applicable.
+
+        Returns Outcome.HANDLED, Outcome.PASS (or None) to pass the request on
+        unchanged, or a transformed request to pass on instead.
+        """
         pass
 
     def set_next(self, handler):
         """Sets the next handler in the chain."""
         self.next_handler = handler
+        Handler._topology_version += 1
 
     def get_next(self):
         """Returns the next handler in the chain."""
         return self.next_handler
 
+class FrozenChain:
+    """Immutable execution plan: the chain's process() methods, bound once, in order."""
+    __slots__ = ("_handlers", "_steps")
+
+    def __init__(self, handlers):
+        self._handlers = tuple(handlers)
+        self._steps = tuple(handler.process for handler in self._handlers)
+
+    @property
+    def handlers(self):
+        return self._handlers
+
+    def __len__(self):
+        return len(self._steps)
+
+    def handle_request(self, request):
+        """Runs the plan. Returns True if a handler handled the request."""
+        for process in self._steps:
+            outcome = process(request)
+            if outcome is Outcome.HANDLED:
+                return True
+            if outcome is not Outcome.PASS and outcome is not None:
+                request = outcome
+        return False
+
+    def set_next(self, handler):
+        raise TypeError("a frozen chain cannot be changed")
+
 class ConcreteHandler1(Handler):
     """Concrete handler that handles requests of type 1."""
 
-    def handle_request(self, request):
+    def process(self, request):
         if request == 1:
             print(f"ConcreteHandler1 handled request: {request}")
-        else:
-            if self.get_next():
-                self.get_next().handle_request(request)
+            return Outcome.HANDLED
+        return Outcome.PASS
 
 class ConcreteHandler2(Handler):
     """Concrete handler that handles requests of type 2."""
 
-    def handle_request(self, request):
+    def process(self, request):
         if request == 2:
             print(f"ConcreteHandler2 handled request: {request}")
-        else:
-            if self.get_next():
-                self.get_next().handle_request(request)
+            return Outcome.HANDLED
+        return Outcome.PASS
 
 class DefaultHandler(Handler):
     """Default handler that handles all other requests."""
 
-    def handle_request(self, request):
+    always_handles = True
+
+    def process(self, request):
         print(f"DefaultHandler handled request: {request}")
+        return Outcome.HANDLED
 
 # Test cases for the Chain of Responsibility pattern
 def test_chain_of_responsibility():
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Modules shared with the other rounds: chain_common.py one directory up, and
+# chain_metrics.py in common/ at the repository root.
+here = Path(__file__).resolve()
+sys.path.append(str(here.parents[1]))
+sys.path.append(str(here.parents[3] / "common"))
@@ -1,5 +1,5 @@
 import pytest
-from chain_of_responsibility import ConcreteHandler1, ConcreteHandler2, DefaultHandler
+from chain_of_responsibility import ConcreteHandler1, ConcreteHandler2, DefaultHandler, Handler, Outcome
 
 def test_concrete_handler1():
     handler1 = ConcreteHandler1()
@@ -30,3 +30,157 @@ def test_chain_of_responsibility():
     handler1.handle_request(2)  # Handled by ConcreteHandler2
     handler1.handle_request(3)  # Handled by DefaultHandler
     handler1.handle_request(4)  # Handled by DefaultHandler
+
+def test_deep_chain_does_not_recurse(capsys):
+    # Longer than the default recursion limit
+    head = ConcreteHandler2()
+    handler = head
+    for _ in range(5000):
+        next_handler = ConcreteHandler2()
+        handler.set_next(next_handler)
+        handler = next_handler
+    handler.set_next(DefaultHandler())
+
+    assert head.handle_request(3) is True
+    assert "DefaultHandler handled request: 3" in capsys.readouterr().out
+
+def test_chain_runs_out():
+    handler1 = ConcreteHandler1()
+    handler1.set_next(None)
+    assert handler1.handle_request(2) is False
+
+class CountingHandler(ConcreteHandler2):
+    """ConcreteHandler2 that counts how often it is asked."""
+    calls = 0
+
+    def process(self, request):
+        self.calls += 1
+        return super().process(request)
+
+def build_counting_chain(length):
+    head = CountingHandler()
+    handlers = [head]
+    for _ in range(length - 1):
+        handlers.append(CountingHandler())
+        handlers[-2].set_next(handlers[-1])
+    handlers[-1].set_next(DefaultHandler())
+    return head, handlers
+
+def test_decision_cache_skips_chain_walk():
+    head, handlers = build_counting_chain(10)
+    head.enable_cache(maxsize=4)
+
+    for _ in range(5):
+        head.handle_request(3)
+
+    assert handlers[5].calls == 1
+    assert head.cache_info() == (4, 1, 4, 1)
+
+def test_decision_cache_is_bounded_lru():
+    head, _ = build_counting_chain(3)
+    head.enable_cache(maxsize=2)
+
+    for request in [3, 4, 3, 5, 3, 4]:
+        head.handle_request(request)
+
+    info = head.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 4, 2)
+
+def test_decision_cache_invalidated_by_set_next(capsys):
+    head, handlers = build_counting_chain(3)
+    head.enable_cache()
+    head.handle_request(1)
+
+    first = ConcreteHandler1()
+    handlers[-1].set_next(first)
+    first.set_next(DefaultHandler())
+    head.handle_request(1)
+
+    assert head.cache_info().currsize == 1
+    assert "ConcreteHandler1 handled request: 1" in capsys.readouterr().out
+
+def test_decision_cache_recovers_from_declining_handler():
+    class Once(Handler):
+        def __init__(self):
+            self.used = False
+
+        def process(self, request):
+            if self.used:
+                return Outcome.PASS
+            self.used = True
+            return Outcome.HANDLED
+
+    once = Once()
+    once.set_next(None)
+    once.enable_cache()
+
+    assert once.handle_request("x") is True
+    assert once.handle_request("x") is False
+    assert once.cache_info().currsize == 0
+    assert ConcreteHandler1().cache_info() is None
+
+def test_metrics_per_hop(capsys):
+    head, handlers = build_counting_chain(3)
+    default_handler = handlers[-1].get_next()
+    metrics = head.enable_metrics()
+
+    head.handle_request(2)
+    head.handle_request(7)
+
+    stats = metrics.snapshot()
+    assert [stat.handler for stat in stats] == handlers + [default_handler]
+    assert stats[0][1:4] == (2, 1, 1)
+    assert stats[1][1:4] == (1, 0, 1)
+    assert stats[3][1:4] == (1, 1, 0)
+    assert all(sum(stat.latency_histogram) == stat.seen for stat in stats)
+
+    head.disable_metrics()
+    head.handle_request(2)
+    assert head.metrics is None
+    assert metrics.snapshot()[0].seen == 2
+
+def test_metrics_count_decision_cache_hits(capsys):
+    head, handlers = build_counting_chain(3)
+    default_handler = handlers[-1].get_next()
+    head.enable_cache()
+    metrics = head.enable_metrics()
+
+    for _ in range(5):
+        head.handle_request(7)
+
+    stats = {stat.handler: stat for stat in metrics.snapshot()}
+    assert stats[default_handler][1:4] == (5, 5, 0)
+    assert stats[head].seen == 1
+    assert sum(stats[default_handler].latency_histogram) == 5
+
+def test_freeze_runs_same_as_live_chain(capsys):
+    handler1 = ConcreteHandler1()
+    handler2 = ConcreteHandler2()
+    default_handler = DefaultHandler()
+    handler1.set_next(handler2)
+    handler2.set_next(default_handler)
+    default_handler.set_next(ConcreteHandler1())  # Can never run
+    frozen = handler1.freeze()
+
+    assert frozen.handlers == (handler1, handler2, default_handler)
+    for request in (1, 2, 3):
+        assert frozen.handle_request(request) is True
+    assert capsys.readouterr().out.splitlines() == [
+        "ConcreteHandler1 handled request: 1",
+        "ConcreteHandler2 handled request: 2",
+        "DefaultHandler handled request: 3",
+    ]
+    with pytest.raises(TypeError):
+        frozen.set_next(handler1)
+
+def test_freeze_stops_at_missing_link_and_detects_cycles():
+    handler1 = ConcreteHandler1()
+    frozen = handler1.freeze()
+    assert len(frozen) == 1
+    assert frozen.handle_request(2) is False
+
+    handler2 = ConcreteHandler2()
+    handler1.set_next(handler2)
+    handler2.set_next(handler1)
+    with pytest.raises(ValueError):
+        handler1.freeze()
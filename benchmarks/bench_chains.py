@@ -0,0 +1,217 @@
+"""Throughput, latency, memory and scaling of every chain implementation.
+
+Run from the repository root:
+
+    python benchmarks/bench_chains.py run --out results.json [--quick]
+    python benchmarks/bench_chains.py compare old.json new.json [--threshold 0.10]
+
+run measures every variant at every chain length and hit position and writes
+one JSON record per cell. compare matches the records of two runs and flags the
+cells that got slower or bigger by more than the threshold; it exits with status
+1 if any did, so it can gate CI.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from variants import MISS, ROOT, VARIANTS, build
+
+LENGTHS = (2, 10, 100, 1000, 10000)
+QUICK_LENGTHS = (2, 10, 100)
+POSITIONS = ("front", "middle", "back", "default")
+PERCENTILES = (50, 90, 99)
+
+# Higher is better for requests_per_sec; lower is better for everything else.
+COMPARED = ("requests_per_sec", "p50_ns", "p99_ns", "bytes_per_handler")
+
+
+def request_for(position, length):
+    """The request that stops at `position` in a chain of `length` handlers."""
+    return {"front": 0, "middle": length // 2, "back": length - 1, "default": MISS}[position]
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[rank - 1]
+
+
+def bytes_per_handler(variant, length):
+    """Memory traced while building the chain, divided by its length."""
+    build(variant, 1)  # import the variant and make its handler class outside the trace
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    handle, chain = build(variant, length)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del handle, chain
+    return used / length
+
+
+def throughput(handle, request, min_time):
+    """Requests per second, timing batches that double until one takes min_time."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            handle(request)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return number / elapsed
+        number *= 2
+
+
+def latencies(handle, request, samples):
+    """Per-request latency percentiles in nanoseconds over `samples` timed calls."""
+    clock = time.perf_counter_ns
+    timings = []
+    for _ in range(samples):
+        start = clock()
+        handle(request)
+        timings.append(clock() - start)
+    timings.sort()
+    return {f"p{percent}_ns": percentile(timings, percent) for percent in PERCENTILES}
+
+
+def measure(variant, length, position, min_time, samples):
+    record = {"variant": variant, "length": length, "position": position}
+    handle, chain = build(variant, length)
+    request = request_for(position, length)
+    try:
+        handle(request)  # warm up, and surface errors such as RecursionError
+        record["requests_per_sec"] = throughput(handle, request, min_time)
+        record.update(latencies(handle, request, samples))
+    except RecursionError:
+        record["error"] = "RecursionError"
+    return record
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run(variants=VARIANTS, lengths=LENGTHS, positions=POSITIONS, min_time=0.2, samples=200, progress=None):
+    """Measure every (variant, length, position) cell and return the results document."""
+    results = []
+    # Some variants print from their handlers; keep that out of the terminal.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for variant in variants:
+            for length in lengths:
+                memory = bytes_per_handler(variant, length)
+                for position in positions:
+                    record = measure(variant, length, position, min_time, samples)
+                    record["bytes_per_handler"] = memory
+                    results.append(record)
+                    if progress is not None:
+                        progress(record)
+    return {"environment": environment(), "settings": {"min_time": min_time, "samples": samples}, "results": results}
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return (key, metric, old, new, change) for every cell that regressed by more than threshold.
+
+    change is the relative change in the bad direction: a drop for requests_per_sec,
+    a rise for latency and memory. A cell that used to run but now errors is
+    reported with metric "error".
+    """
+    def keyed(document):
+        return {(r["variant"], r["length"], r["position"]): r for r in document["results"]}
+
+    old_records = keyed(baseline)
+    regressions = []
+    for key, new in sorted(keyed(current).items()):
+        old = old_records.get(key)
+        if old is None:
+            continue
+        if "error" in new:
+            if "error" not in old:
+                regressions.append((key, "error", None, new["error"], None))
+            continue
+        if "error" in old:
+            continue
+        for metric in COMPARED:
+            if not old.get(metric) or metric not in new:
+                continue
+            if metric == "requests_per_sec":
+                change = (old[metric] - new[metric]) / old[metric]
+            else:
+                change = (new[metric] - old[metric]) / old[metric]
+            if change > threshold:
+                regressions.append((key, metric, old[metric], new[metric], change))
+    return regressions
+
+
+def _print_record(record):
+    label = f"{record['variant']:<15} {record['length']:>6} {record['position']:<8}"
+    if "error" in record:
+        print(f"{label} {record['error']}", file=sys.stderr)
+        return
+    print(
+        f"{label} {record['requests_per_sec']:>12.0f} req/s"
+        f" p50 {record['p50_ns']:>9} ns p99 {record['p99_ns']:>9} ns"
+        f" {record['bytes_per_handler']:>7.0f} B/handler",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="measure every variant and write a results file")
+    run_parser.add_argument("--out", required=True, help="JSON results file to write")
+    run_parser.add_argument("--quick", action="store_true", help=f"only chain lengths {QUICK_LENGTHS}")
+    run_parser.add_argument("--variant", action="append", choices=VARIANTS, help="limit to these variants")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds per throughput measurement")
+    run_parser.add_argument("--samples", type=int, default=200, help="timed requests per latency measurement")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        document = run(
+            variants=args.variant or VARIANTS,
+            lengths=QUICK_LENGTHS if args.quick else LENGTHS,
+            min_time=args.min_time,
+            samples=args.samples,
+            progress=_print_record,
+        )
+        with open(args.out, "w") as output:
+            json.dump(document, output, indent=2)
+        return 0
+
+    with open(args.baseline) as baseline, open(args.current) as current:
+        regressions = compare(json.load(baseline), json.load(current), args.threshold)
+    for (variant, length, position), metric, old, new, change in regressions:
+        detail = f"{old} -> {new}" if change is None else f"{old:.0f} -> {new:.0f} ({change:+.0%})"
+        print(f"REGRESSION {variant} length={length} position={position} {metric}: {detail}")
+    if not regressions:
+        print("no regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
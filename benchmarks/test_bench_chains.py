@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from bench_chains import compare, main, percentile, run
+from variants import MISS, VARIANTS, build
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_every_variant_builds_and_runs(variant, capsys):
+    """Test that each adapter builds a working chain for hits and misses"""
+    handle, chain = build(variant, 3)
+    for request in (0, 2, MISS):
+        handle(request)
+    capsys.readouterr()
+
+
+def test_run_writes_one_record_per_cell():
+    """Test a tiny run covers every variant and position, and that deep linked chains run"""
+    document = run(lengths=(2,), min_time=0.001, samples=5)
+    assert len(document["results"]) == len(VARIANTS) * 4
+    record = document["results"][0]
+    assert {"requests_per_sec", "p50_ns", "p90_ns", "p99_ns", "bytes_per_handler"} <= set(record)
+    assert document["environment"]["python"]
+
+    deep = run(variants=("chatgpt-round1",), lengths=(5000,), positions=("default",), min_time=0.001, samples=5)
+    assert "error" not in deep["results"][0]
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, percent) for percent in (50, 90, 99, 100)] == [50, 90, 99, 100]
+    assert percentile([7], 99) == 7
+
+
+def record(rate, p50=100, p99=200, memory=64, **extra):
+    return dict(variant="v", length=10, position="back", requests_per_sec=rate, p50_ns=p50, p99_ns=p99,
+                bytes_per_handler=memory, **extra)
+
+
+def test_compare_flags_only_changes_in_the_bad_direction(tmp_path, capsys):
+    """Test that compare reports slowdowns, growth and new errors past the threshold"""
+    baseline = {"results": [record(1000), dict(record(1000), position="front")]}
+    current = {"results": [record(850, p99=260, memory=60), dict(record(1200), position="front")]}
+    regressions = compare(baseline, current, threshold=0.10)
+    assert [(metric, round(change, 2)) for _, metric, _, _, change in regressions] == [
+        ("requests_per_sec", 0.15),
+        ("p99_ns", 0.3),
+    ]
+    errored = {"results": [{"variant": "v", "length": 10, "position": "back", "error": "RecursionError"}]}
+    assert [metric for _, metric, *_ in compare(baseline, errored)] == ["error"]
+
+    old_file, new_file = tmp_path / "old.json", tmp_path / "new.json"
+    old_file.write_text(json.dumps(baseline))
+    new_file.write_text(json.dumps(current))
+    assert main(["compare", str(old_file), str(new_file)]) == 1
+    assert main(["compare", str(old_file), str(old_file)]) == 0
+    assert "REGRESSION v length=10 position=back requests_per_sec" in capsys.readouterr().out
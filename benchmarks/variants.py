@@ -0,0 +1,171 @@
+"""Adapters that build an N-handler chain in each of the six implementations.
+
+Every variant gets the same workload: handler i handles request i and passes
+everything else on, so a request's integer picks where in the chain it stops.
+MISS is handled by nobody and runs to the end of the chain (or to the variant's
+own default handler, where it has one).
+"""
+import functools
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Request that no handler in the chain accepts.
+MISS = -1
+
+_MODULES = {
+    "chatgpt-round1": ("ChatGPT3_5/ChainResponsibility/round1", "code.py"),
+    "chatgpt-round2": ("ChatGPT3_5/ChainResponsibility/round2", "code.py"),
+    "chatgpt-round3": ("ChatGPT3_5/ChainResponsibility/round3", "code.py"),
+    "gemini-round1": ("Gemini_Flash/Chain_of_responsbility/round_1", "chain_of_responsibility.py"),
+    "gemini-round2": ("Gemini_Flash/Chain_of_responsbility/round_2", "chain_of_responsibility.py"),
+    "gemini-round3": ("Gemini_Flash/Chain_of_responsbility/round_3", "chain_of_responsibility.py"),
+}
+
+# Directories with modules shared by several variants; the loader makes them
+# importable while a variant's module runs its imports.
+_SHARED = (ROOT / "common", ROOT / "Gemini_Flash/Chain_of_responsbility")
+
+_loaded = {}
+
+
+def load(variant):
+    """Import a variant's module under a unique name, with its directory and the shared ones importable."""
+    module = _loaded.get(variant)
+    if module is None:
+        directory, filename = _MODULES[variant]
+        directory = ROOT / directory
+        name = "bench_" + variant.replace("-", "_")
+        spec = importlib.util.spec_from_file_location(name, directory / filename)
+        module = importlib.util.module_from_spec(spec)
+        paths = [str(directory), *map(str, _SHARED)]
+        sys.path[:0] = paths
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            for path in paths:
+                sys.path.remove(path)
+        _loaded[variant] = module
+    return module
+
+
+# The handler classes are made once per module, so building a chain allocates
+# only the handlers and their links.
+
+@functools.cache
+def _looped_handler(module):
+    """round1/round2: handlers return an Outcome and Handler.handle() walks the links."""
+    outcome = module.Outcome
+
+    class KeyHandler(module.Handler):
+        def __init__(self, key):
+            super().__init__()
+            self.key = key
+
+        def process(self, request):
+            return outcome.HANDLED if request == self.key else outcome.PASS
+
+    return KeyHandler
+
+
+def _chatgpt_looped(module, length):
+    KeyHandler = _looped_handler(module)
+    handlers = [KeyHandler(key) for key in range(length)]
+    for handler, successor in zip(handlers, handlers[1:]):
+        handler.set_next(successor)
+    return handlers[0].handle, handlers
+
+
+@functools.cache
+def _round3_handler(module):
+    outcome = module.Outcome
+    # round3 handlers log through a sink; measure the chain, not the logging.
+    null_sink = sys.modules[module.LoggerSink.__module__].NullSink()
+
+    class KeyHandler(module.Handler):
+        __slots__ = ("key",)
+
+        def __init__(self, key):
+            super().__init__(sink=null_sink)
+            self.key = key
+
+        def process(self, request):
+            return outcome.HANDLED if request == self.key else outcome.PASS
+
+    return KeyHandler
+
+
+def _chatgpt_round3(module, length):
+    KeyHandler = _round3_handler(module)
+    handlers = [KeyHandler(key) for key in range(length)]
+    for handler, successor in zip(handlers, handlers[1:]):
+        handler.set_next(successor)
+    return handlers[0].handle, handlers
+
+
+@functools.cache
+def _keyed_handler(module):
+    class KeyHandler(module.Handler):
+        def __init__(self, key):
+            self.key = key
+            self.keys = frozenset((key,))
+
+        def handle_request(self, request):
+            return request == self.key
+
+    return KeyHandler
+
+
+def _gemini_round1(module, length):
+    KeyHandler = _keyed_handler(module)
+    chain = module.ChainOfResponsibility()
+    for key in range(length):
+        chain.add_handler(KeyHandler(key))
+    return chain.handle_request, chain
+
+
+@functools.cache
+def _linked_handler(module):
+    outcome = module.Outcome
+
+    class KeyHandler(module.Handler):
+        def __init__(self, key):
+            self.key = key
+            self.next_handler = None
+
+        def process(self, request):
+            return outcome.HANDLED if request == self.key else outcome.PASS
+
+    return KeyHandler
+
+
+def _gemini_linked(module, length, entry_point, has_default):
+    KeyHandler = _linked_handler(module)
+    handlers = [KeyHandler(key) for key in range(length)]
+    if has_default:
+        handlers.append(module.DefaultHandler())
+    for handler, successor in zip(handlers, handlers[1:]):
+        handler.set_next(successor)
+    return getattr(handlers[0], entry_point), handlers
+
+
+_BUILDERS = {
+    "chatgpt-round1": _chatgpt_looped,
+    "chatgpt-round2": _chatgpt_looped,
+    "chatgpt-round3": _chatgpt_round3,
+    "gemini-round1": _gemini_round1,
+    "gemini-round2": lambda module, length: _gemini_linked(module, length, "handle", False),
+    "gemini-round3": lambda module, length: _gemini_linked(module, length, "handle_request", True),
+}
+
+VARIANTS = tuple(_BUILDERS)
+
+
+def build(variant, length):
+    """Return (handle, chain) for a chain of `length` key handlers.
+
+    handle(request) runs one request; keep chain alive for as long as handle is used.
+    """
+    return _BUILDERS[variant](load(variant), length)
@@ -0,0 +1,94 @@
+"""Per-handler chain telemetry shared by the ChatGPT and Gemini chain rounds.
+
+Modules import it as chain_metrics; the conftest.py next to each round's tests
+and the benchmark loader put this directory on sys.path.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+HandlerStats = namedtuple("HandlerStats", ["handler", "seen", "handled", "passed", "latency_histogram"])
+
+# Upper bounds of the latency histogram buckets, in nanoseconds. One more bucket
+# collects everything slower than the last bound.
+LATENCY_BUCKETS_NS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+class ChainMetrics:
+    """Per-handler telemetry kept in flat arrays.
+
+    Every handler gets a slot the first time it is measured. A slot holds three
+    counters (requests seen, handled, passed on) and one histogram row of
+    latency bucket counts. Named events, such as circuit breaker state changes,
+    are counted per slot alongside.
+
+    One ChainMetrics may be shared by chains running on many threads: updates and
+    snapshots take a lock, so no count is lost and each handler gets one slot.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_NS):
+        self.buckets = tuple(buckets)
+        self._row = len(self.buckets) + 1
+        self._slots = {}
+        self._handlers = []
+        self._counts = array("Q")
+        self._histogram = array("Q")
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, handler):
+        # Called with the lock held.
+        slot = self._slots.get(id(handler))
+        if slot is None:
+            slot = self._slots[id(handler)] = len(self._handlers)
+            self._handlers.append(handler)
+            self._counts.extend((0, 0, 0))
+            self._histogram.extend([0] * self._row)
+        return slot
+
+    def record(self, handler, handled, elapsed_ns, requests=1):
+        """Count `requests` requests that took `elapsed_ns` in total at this handler."""
+        bucket = bisect_left(self.buckets, elapsed_ns // requests)
+        with self._lock:
+            slot = self._slot(handler)
+            counts = self._counts
+            counts[slot * 3] += requests
+            counts[slot * 3 + (1 if handled else 2)] += requests
+            self._histogram[slot * self._row + bucket] += requests
+
+    def record_event(self, handler, event, count=1):
+        """Count a named event at this handler."""
+        with self._lock:
+            key = (self._slot(handler), event)
+            self._events[key] = self._events.get(key, 0) + count
+
+    def events(self):
+        """Return {(handler, event): count} for every event recorded so far."""
+        with self._lock:
+            return {(self._handlers[slot], event): count for (slot, event), count in self._events.items()}
+
+    def snapshot(self):
+        """Return a HandlerStats for every measured handler, in the order they were first seen."""
+        row = self._row
+        with self._lock:
+            counts = self._counts
+            return [
+                HandlerStats(
+                    handler,
+                    counts[slot * 3],
+                    counts[slot * 3 + 1],
+                    counts[slot * 3 + 2],
+                    tuple(self._histogram[slot * row:(slot + 1) * row]),
+                )
+                for slot, handler in enumerate(self._handlers)
+            ]
+
+    def reset(self):
+        """Zero every counter and forget the handlers."""
+        with self._lock:
+            self._slots.clear()
+            self._handlers.clear()
+            self._events.clear()
+            del self._counts[:]
+            del self._histogram[:]